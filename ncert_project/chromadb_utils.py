@@ -3,6 +3,11 @@ Enhanced ChromaDB utility for storing book chunks with proper labeling
 Format: Class 5, Subject: Maths, Chapter: 1
 """
 import os
+import hashlib
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 import chromadb
 from chromadb.config import Settings as ChromaSettings
 from django.conf import settings
@@ -12,8 +17,49 @@ from typing import List, Dict, Optional
 
 logger = logging.getLogger(__name__)
 
+# get_stats() scans every chunk's metadata; reuse the result this long while
+# the collection's document count is unchanged
+STATS_CACHE_TTL = 60
+
+# Metadata rows fetched per page while computing stats
+STATS_PAGE_SIZE = 5000
+
+# Cached MCQ sets older than this are regenerated
+MCQ_CACHE_MAX_AGE = 30 * 24 * 60 * 60  # seconds
+
+# orjson is optional and only speeds up the MCQ cache (de)serialization
+try:
+    import orjson
+    _json_loads = orjson.loads
+    
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+
+def _select_embedding_device() -> str:
+    """Pick the fastest available device for the embedding model (CUDA > MPS > CPU)"""
+    try:
+        import torch
+        if torch.cuda.is_available():
+            return 'cuda'
+        if getattr(torch.backends, 'mps', None) and torch.backends.mps.is_available():
+            return 'mps'
+    except ImportError:
+        pass
+    return 'cpu'
+
+
 # Initialize sentence transformer for embeddings
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+# Embeddings are computed here in batches and handed to Chroma, so its
+# default one-by-one ONNX embedder on CPU is never used
+EMBEDDING_DEVICE = _select_embedding_device()
+EMBEDDING_BATCH_SIZE = 64
+embedding_model = SentenceTransformer('all-MiniLM-L6-v2', device=EMBEDDING_DEVICE)
+if EMBEDDING_DEVICE == 'cuda':
+    embedding_model.half()  # FP16 inference on GPU
 
 
 class ChromaDBManager:
@@ -33,7 +79,9 @@ class ChromaDBManager:
         """
         self.client = None
         self.collection = None
+        self.mcq_cache = None
         self._initialized = False
+        self._stats_cache = None  # (document count, computed at, stats)
     
     def _ensure_initialized(self):
         """Lazy initialization - only create client when first needed"""
@@ -48,9 +96,20 @@ class ChromaDBManager:
                 # Don't create ChromaDB folder if using Pinecone
                 return
             
-            self.client = chromadb.PersistentClient(
-                path=settings.CHROMA_PERSIST_DIRECTORY
-            )
+            chroma_http_url = getattr(settings, 'CHROMA_HTTP_URL', '')
+            if chroma_http_url:
+                # Chroma server: SQLite writes and HNSW updates happen server-side
+                url = urlparse(chroma_http_url)
+                self.client = chromadb.HttpClient(
+                    host=url.hostname,
+                    port=url.port or (443 if url.scheme == 'https' else 8000),
+                    ssl=url.scheme == 'https'
+                )
+                logger.info(f"[OK] Using ChromaDB server at {chroma_http_url}")
+            else:
+                self.client = chromadb.PersistentClient(
+                    path=settings.CHROMA_PERSIST_DIRECTORY
+                )
             
             self.collection = self.client.get_or_create_collection(
                 name=settings.CHROMA_COLLECTION_NAME,
@@ -60,6 +119,16 @@ class ChromaDBManager:
                 }
             )
             
+            # Generated quiz MCQs, keyed on chapter content so unchanged
+            # chapters never go back to the LLM
+            self.mcq_cache = self.client.get_or_create_collection(
+                name=settings.CHROMA_MCQ_CACHE_COLLECTION,
+                metadata={
+                    "description": "Generated quiz MCQs keyed on chapter content hash",
+                    "hnsw:space": "cosine"
+                }
+            )
+            
             self._initialized = True
             logger.info(f"[OK] ChromaDB initialized: {settings.CHROMA_COLLECTION_NAME}")
             logger.info(f"[STATS] Current document count: {self.collection.count()}")
@@ -141,59 +210,84 @@ class ChromaDBManager:
             logger.info(f"[BOOK] Adding chunks for {base_metadata['class']} - "
                        f"{base_metadata['subject']} - {base_metadata['chapter']}")
             
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                
-                # Prepare batch data
-                ids = []
-                documents = []
-                metadatas = []
+            # Writes go through a single background thread so the next batch is
+            # embedded while the previous one is being inserted/indexed; only one
+            # add() is ever in flight, so the collection still sees one writer
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                pending = None
                 
-                for chunk in batch:
-                    # Create unique ID with clear labeling
-                    chunk_id = (
-                        f"class_{standard}_"
-                        f"subject_{subject.lower().replace(' ', '_')}_"
-                        f"chapter_{chunk.get('chapter_num', chapter)}_"
-                        f"page_{chunk.get('page', 0)}_"
-                        f"chunk_{chunk.get('chunk_index', 0)}"
-                    )
+                for i in range(0, len(chunks), batch_size):
+                    batch = chunks[i:i + batch_size]
                     
-                    # Merge metadata
-                    chunk_metadata = base_metadata.copy()
-                    chunk_metadata.update({
-                        'page': chunk.get('page', 0),
-                        'chunk_index': chunk.get('chunk_index', 0),
-                        'char_count': len(chunk['text']),
-                        'has_equations': chunk.get('has_equations', False),
-                        'content_type': chunk.get('content_type', 'general')
-                    })
+                    # Prepare batch data
+                    ids = []
+                    documents = []
+                    metadatas = []
                     
-                    ids.append(chunk_id)
-                    documents.append(chunk['text'])
-                    metadatas.append(chunk_metadata)
-                
-                # Generate embeddings
-                embeddings = embedding_model.encode(documents).tolist()
-                
-                # Add to collection
-                self.collection.add(
-                    ids=ids,
-                    documents=documents,
-                    embeddings=embeddings,
-                    metadatas=metadatas
-                )
+                    for chunk in batch:
+                        # Create unique ID with clear labeling
+                        chunk_id = (
+                            f"class_{standard}_"
+                            f"subject_{subject.lower().replace(' ', '_')}_"
+                            f"chapter_{chunk.get('chapter_num', chapter)}_"
+                            f"page_{chunk.get('page', 0)}_"
+                            f"chunk_{chunk.get('chunk_index', 0)}"
+                        )
+                        
+                        # Merge metadata
+                        chunk_metadata = base_metadata.copy()
+                        chunk_metadata.update({
+                            'page': chunk.get('page', 0),
+                            'chunk_index': chunk.get('chunk_index', 0),
+                            'char_count': len(chunk['text']),
+                            'has_equations': chunk.get('has_equations', False),
+                            'content_type': chunk.get('content_type', 'general')
+                        })
+                        
+                        ids.append(chunk_id)
+                        documents.append(chunk['text'])
+                        metadatas.append(chunk_metadata)
+                    
+                    # Generate embeddings for the whole batch in one call
+                    embeddings = embedding_model.encode(
+                        documents,
+                        batch_size=EMBEDDING_BATCH_SIZE,
+                        convert_to_numpy=True,
+                        normalize_embeddings=True
+                    ).astype('float32').tolist()
+                    
+                    # Wait for the previous batch before queueing this one
+                    if pending is not None:
+                        total_added += pending.result()
+                    
+                    # Add to collection
+                    pending = writer.submit(
+                        self._add_batch, i // batch_size + 1, ids, documents, embeddings, metadatas
+                    )
                 
-                total_added += len(batch)
-                logger.info(f"[OK] Added batch {i//batch_size + 1}: {len(batch)} chunks")
+                if pending is not None:
+                    total_added += pending.result()
             
             logger.info(f"[SUCCESS] Successfully added {total_added} chunks to ChromaDB")
+            self._stats_cache = None
             return total_added
             
         except Exception as e:
             logger.error(f"[ERROR] Error adding chunks to ChromaDB: {str(e)}")
             raise
     
+    def _add_batch(self, batch_num: int, ids: List[str], documents: List[str],
+                   embeddings: List[List[float]], metadatas: List[Dict]) -> int:
+        """Write one prepared batch to the collection (runs on the writer thread)"""
+        self.collection.add(
+            ids=ids,
+            documents=documents,
+            embeddings=embeddings,
+            metadatas=metadatas
+        )
+        logger.info(f"[OK] Added batch {batch_num}: {len(ids)} chunks")
+        return len(ids)
+    
     def query_by_class_subject_chapter(
         self,
         query_text: str,
@@ -262,11 +356,112 @@ class ChromaDBManager:
             logger.error(f"[ERROR] Error querying ChromaDB: {str(e)}")
             return {'documents': [[]], 'metadatas': [[]], 'distances': [[]]}
     
+    @staticmethod
+    def _mcq_cache_id(documents: List[str], chapter_id: str, version: str) -> str:
+        """
+        Cache key for generated MCQs: chapter id + sha256 of the generator
+        version and the chapter content
+        Hashes the documents as if joined with blank lines, without joining them
+        """
+        content_hash = hashlib.sha256(f"{version}\n".encode('utf-8'))
+        for i, doc in enumerate(documents):
+            if i:
+                content_hash.update(b'\n\n')
+            content_hash.update(doc.encode('utf-8'))
+        return f"{chapter_id}_{content_hash.hexdigest()}"
+    
+    @staticmethod
+    def _mcq_cache_embedding(documents: List[str]) -> List[float]:
+        """Embed the opening ~2000 characters of the chapter for near-duplicate lookups"""
+        head = []
+        size = 0
+        for doc in documents:
+            head.append(doc)
+            size += len(doc) + 2
+            if size >= 2000:
+                break
+        return embedding_model.encode(["\n\n".join(head)[:2000]]).tolist()[0]
+    
+    def get_cached_mcqs(self, documents: List[str], chapter_id: str, version: str,
+                        similarity_threshold: float = 0.97) -> Optional[List[Dict]]:
+        """
+        Return MCQs previously generated for this chapter's chunks, if any
+        
+        An exact content hash match is tried first; otherwise the nearest cached
+        entry for the same chapter is reused when its content embedding is close
+        enough (e.g. the same chapter re-uploaded from a different edition).
+        Only entries from the same generator `version` (model + prompt) and
+        younger than MCQ_CACHE_MAX_AGE are served.
+        """
+        self._ensure_initialized()  # Lazy init
+        if self.mcq_cache is None:
+            return None
+        
+        try:
+            cutoff = time.time() - MCQ_CACHE_MAX_AGE
+            hit = self.mcq_cache.get(ids=[self._mcq_cache_id(documents, chapter_id, version)], include=['metadatas'])
+            if hit['ids'] and hit['metadatas'][0].get('cached_at', 0) >= cutoff:
+                logger.info(f"[OK] MCQ cache hit for {chapter_id}")
+                return _json_loads(hit['metadatas'][0]['mcq_json'])
+            
+            content_embedding = self._mcq_cache_embedding(documents)
+            nearest = self.mcq_cache.query(
+                query_embeddings=[content_embedding],
+                n_results=1,
+                where={"$and": [
+                    {"chapter_id": chapter_id},
+                    {"version": version},
+                    {"cached_at": {"$gte": cutoff}},
+                ]},
+                include=['metadatas', 'distances']
+            )
+            if nearest['ids'][0] and 1 - nearest['distances'][0][0] >= similarity_threshold:
+                logger.info(f"[OK] MCQ cache near-duplicate hit for {chapter_id}")
+                return _json_loads(nearest['metadatas'][0][0]['mcq_json'])
+        except Exception as e:
+            logger.warning(f"[WARNING]  MCQ cache lookup failed: {str(e)}")
+        
+        return None
+    
+    def evict_cached_mcqs(self, chapter_id: str):
+        """Drop every cached MCQ set for a chapter, near-duplicate editions included"""
+        self._ensure_initialized()  # Lazy init
+        if self.mcq_cache is None:
+            return
+        
+        try:
+            self.mcq_cache.delete(where={"chapter_id": chapter_id})
+            logger.info(f"[OK] Evicted cached MCQs for {chapter_id}")
+        except Exception as e:
+            logger.warning(f"[WARNING]  Could not evict cached MCQs: {str(e)}")
+    
+    def cache_mcqs(self, documents: List[str], chapter_id: str, mcq_data: List[Dict], version: str):
+        """Store generated MCQs keyed on the generator version and the chapter content they came from"""
+        self._ensure_initialized()  # Lazy init
+        if self.mcq_cache is None:
+            return
+        
+        try:
+            self.mcq_cache.upsert(
+                ids=[self._mcq_cache_id(documents, chapter_id, version)],
+                embeddings=[self._mcq_cache_embedding(documents)],
+                metadatas=[{
+                    "chapter_id": chapter_id,
+                    "version": version,
+                    "cached_at": time.time(),
+                    "mcq_json": _json_dumps(mcq_data),
+                }]
+            )
+            logger.info(f"[OK] Cached {len(mcq_data)} MCQs for {chapter_id}")
+        except Exception as e:
+            logger.warning(f"[WARNING]  Could not cache MCQs: {str(e)}")
+    
     def get_available_classes(self) -> List[str]:
         """Get list of all available classes in the database"""
         try:
             # Get sample of all documents to extract unique classes
-            results = self.collection.get(limit=1000)
+            # (metadata only - documents and embeddings are not needed here)
+            results = self.collection.get(limit=1000, include=['metadatas'])
             classes = set()
             
             for metadata in results['metadatas']:
@@ -286,7 +481,8 @@ class ChromaDBManager:
             
             results = self.collection.get(
                 where={'class': class_num},
-                limit=1000
+                limit=1000,
+                include=['metadatas']
             )
             
             subjects = set()
@@ -312,7 +508,8 @@ class ChromaDBManager:
                         {'subject': {'$eq': str(subject).title()}}
                     ]
                 },
-                limit=1000
+                limit=1000,
+                include=['metadatas']
             )
             
             chapters = set()
@@ -326,24 +523,40 @@ class ChromaDBManager:
             return []
     
     def get_stats(self) -> Dict:
-        """Get statistics about stored documents"""
+        """
+        Get statistics about stored documents
+        Cached for STATS_CACHE_TTL seconds, keyed on the (cheap) document count
+        """
         self._ensure_initialized()  # Lazy init
         
         try:
             total_docs = self.collection.count()
-            classes = self.get_available_classes()
+            if self._stats_cache is not None:
+                cached_count, computed_at, cached_stats = self._stats_cache
+                if cached_count == total_docs and time.monotonic() - computed_at < STATS_CACHE_TTL:
+                    return cached_stats
+            
+            # One metadata pass (paged) builds both the class list and the
+            # subjects per class, instead of one query per class
+            subjects_by_class = {}
+            for offset in range(0, total_docs, STATS_PAGE_SIZE):
+                results = self.collection.get(offset=offset, limit=STATS_PAGE_SIZE, include=['metadatas'])
+                for metadata in results['metadatas']:
+                    if 'class' not in metadata:
+                        continue
+                    subjects = subjects_by_class.setdefault(metadata['class'], set())
+                    if 'subject' in metadata:
+                        subjects.add(metadata['subject'])
             
+            classes = sorted(subjects_by_class)
             stats = {
                 'total_documents': total_docs,
                 'total_classes': len(classes),
                 'classes': classes,
-                'subjects_by_class': {}
+                'subjects_by_class': {class_num: sorted(subjects_by_class[class_num]) for class_num in classes}
             }
             
-            for class_num in classes:
-                subjects = self.get_subjects_by_class(class_num)
-                stats['subjects_by_class'][class_num] = subjects
-            
+            self._stats_cache = (total_docs, time.monotonic(), stats)
             return stats
         except Exception as e:
             logger.error(f"[ERROR] Error getting stats: {str(e)}")
@@ -360,6 +573,7 @@ class ChromaDBManager:
                     "hnsw:space": "cosine"
                 }
             )
+            self._stats_cache = None
             logger.info("[OK] Collection cleared successfully")
         except Exception as e:
             logger.error(f"[ERROR] Error clearing collection: {str(e)}")
@@ -3,7 +3,8 @@ MongoDB utility functions for storing user and admin data
 This file provides a simple interface to interact with MongoDB
 for user-related data while ChromaDB handles document chunks
 """
-from pymongo import MongoClient
+from contextlib import contextmanager
+from pymongo import IndexModel, MongoClient
 from django.conf import settings
 import logging
 
@@ -38,6 +39,7 @@ class MongoDBManager:
                     mongodb_uri,
                     serverSelectionTimeoutMS=5000,
                     connectTimeoutMS=10000,
+                    maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
                     retryWrites=True,
                     w='majority'
                 )
@@ -47,7 +49,6 @@ class MongoDBManager:
                 
                 self._db = self._client[settings.MONGODB_DB_NAME]
                 logger.info(f"✅ Connected to MongoDB Atlas: {settings.MONGODB_DB_NAME}")
-                logger.info(f"   Collections: {self._db.list_collection_names()}")
             except Exception as e:
                 logger.error(f"❌ Failed to connect to MongoDB Atlas: {str(e)}")
                 logger.error("   Check: 1) Network access allowed in MongoDB Atlas")
@@ -143,6 +144,20 @@ def sync_django_user_to_mongo(user_obj):
         return None
 
 
+def _chat_document(student_id, question, answer, model_used='openai', **kwargs):
+    """Build the MongoDB chat_history document for one chat turn"""
+    return {
+        'student_id': student_id,
+        'question': question,
+        'answer': answer,
+        'model_used': model_used,
+        'created_at': kwargs.get('created_at'),
+        'has_images': kwargs.get('has_images', False),
+        'sources': kwargs.get('sources', []),
+        'difficulty_level': kwargs.get('difficulty_level', 'normal'),
+    }
+
+
 def save_chat_to_mongo(student_id, question, answer, model_used='openai', **kwargs):
     """
     Save chat history to MongoDB
@@ -158,16 +173,7 @@ def save_chat_to_mongo(student_id, question, answer, model_used='openai', **kwar
         db = get_mongo_db()
         chat_collection = db.chat_history
         
-        chat_data = {
-            'student_id': student_id,
-            'question': question,
-            'answer': answer,
-            'model_used': model_used,
-            'created_at': kwargs.get('created_at'),
-            'has_images': kwargs.get('has_images', False),
-            'sources': kwargs.get('sources', []),
-            'difficulty_level': kwargs.get('difficulty_level', 'normal'),
-        }
+        chat_data = _chat_document(student_id, question, answer, model_used, **kwargs)
         
         result = chat_collection.insert_one(chat_data)
         logger.info(f"✅ Saved chat to MongoDB: {result.inserted_id}")
@@ -178,6 +184,32 @@ def save_chat_to_mongo(student_id, question, answer, model_used='openai', **kwar
         return None
 
 
+def save_chats_to_mongo(chats):
+    """
+    Save many chat turns to MongoDB in one unordered insert_many
+    
+    Args:
+        chats: Iterable of dicts with save_chat_to_mongo's arguments
+               (student_id, question, answer, model_used, and metadata)
+    
+    Returns:
+        Number of documents inserted
+    """
+    try:
+        documents = [_chat_document(**chat) for chat in chats]
+        if not documents:
+            return 0
+        
+        db = get_mongo_db()
+        result = db.chat_history.insert_many(documents, ordered=False)
+        logger.info(f"✅ Saved {len(result.inserted_ids)} chats to MongoDB")
+        return len(result.inserted_ids)
+        
+    except Exception as e:
+        logger.error(f"❌ Error saving chats to MongoDB: {str(e)}")
+        return 0
+
+
 def get_user_chat_history(student_id, limit=50):
     """
     Retrieve user's chat history from MongoDB
@@ -204,50 +236,121 @@ def get_user_chat_history(student_id, limit=50):
         return []
 
 
+# Indexes per collection as (keys, options); names are pymongo's defaults
+MONGO_INDEXES = {
+    'users': [
+        ('django_id', {'unique': True}),
+        ('email', {'unique': True}),
+        ('role', {}),
+    ],
+    'chat_history': [
+        ('student_id', {}),
+        ('created_at', {}),
+        ([('student_id', 1), ('created_at', -1)], {}),
+    ],
+    'chat_cache': [
+        ('question_hash', {'unique': True}),
+        ('expires_at', {}),
+    ],
+    'permanent_memory': [
+        ('student_id', {}),
+        ([('student_id', 1), ('last_accessed', -1)], {}),
+    ],
+    'quiz_attempts': [
+        ('django_id', {'unique': True}),
+        ('student_id', {}),
+        ('chapter_id', {}),
+        ([('student_id', 1), ('started_at', -1)], {}),
+    ],
+    'student_progress': [
+        ([('student_id', 1), ('chapter_id', 1)], {'unique': True}),
+        ('student_id', {}),
+    ],
+}
+
+
 def create_indexes():
     """
     Create indexes for better query performance
-    Run this once after setting up MongoDB
+    Safe to re-run: indexes that already exist are skipped, and missing ones
+    are built in the background so live writes aren't blocked
+    
+    Returns:
+        {'created': int, 'skipped': int}, or None on error
     """
     try:
         db = get_mongo_db()
+        created = 0
+        skipped = 0
+        
+        for collection_name, specs in MONGO_INDEXES.items():
+            collection = db[collection_name]
+            existing = {index['name'] for index in collection.list_indexes()}
+            
+            missing = []
+            for keys, options in specs:
+                model = IndexModel(keys, background=True, **options)
+                if model.document['name'] in existing:
+                    skipped += 1
+                else:
+                    missing.append(model)
+            
+            if missing:
+                collection.create_indexes(missing)
+                created += len(missing)
+        
+        logger.info(f"✅ MongoDB indexes ready ({created} created, {skipped} already existed)")
+        return {'created': created, 'skipped': skipped}
         
-        # User collection indexes
-        db.users.create_index('django_id', unique=True)
-        db.users.create_index('email', unique=True)
-        db.users.create_index('role')
-        
-        # Chat history indexes
-        db.chat_history.create_index('student_id')
-        db.chat_history.create_index('created_at')
-        db.chat_history.create_index([('student_id', 1), ('created_at', -1)])
-        
-        # Chat cache indexes
-        db.chat_cache.create_index('question_hash', unique=True)
-        db.chat_cache.create_index('expires_at')
-        
-        # Permanent memory indexes
-        db.permanent_memory.create_index('student_id')
-        db.permanent_memory.create_index([('student_id', 1), ('last_accessed', -1)])
-        
-        # Quiz attempts indexes
-        db.quiz_attempts.create_index('django_id', unique=True)
-        db.quiz_attempts.create_index('student_id')
-        db.quiz_attempts.create_index('chapter_id')
-        db.quiz_attempts.create_index([('student_id', 1), ('started_at', -1)])
-        
-        # Student progress indexes
-        db.student_progress.create_index([('student_id', 1), ('chapter_id', 1)], unique=True)
-        db.student_progress.create_index('student_id')
-        
-        logger.info("✅ MongoDB indexes created successfully")
+    except Exception as e:
+        logger.error(f"❌ Error creating indexes: {str(e)}")
+        return None
+
+
+def drop_secondary_indexes(collection_names):
+    """
+    Drop the non-unique secondary indexes of the given collections, so a
+    bulk load doesn't maintain them row by row. Rebuild with create_indexes()
+    _id and unique indexes are kept: live upserts look rows up through them
+    and they are what stops duplicates from being inserted meanwhile
+    
+    Args:
+        collection_names: Collections about to be bulk loaded
+    
+    Returns:
+        True on success, False on error
+    """
+    try:
+        db = get_mongo_db()
+        dropped = 0
+        for collection_name in collection_names:
+            collection = db[collection_name]
+            for index in list(collection.list_indexes()):
+                if index['name'] == '_id_' or index.get('unique'):
+                    continue
+                collection.drop_index(index['name'])
+                dropped += 1
+        logger.info(f"✅ Dropped {dropped} secondary MongoDB indexes for bulk load")
         return True
         
     except Exception as e:
-        logger.error(f"❌ Error creating indexes: {str(e)}")
+        logger.error(f"❌ Error dropping indexes: {str(e)}")
         return False
 
 
+@contextmanager
+def bulk_load_indexes(collection_names):
+    """
+    Run a bulk load (e.g. save_chats_to_mongo over a large import) without the
+    collections' non-unique secondary indexes, rebuilding them once the block finishes
+    """
+    drop_secondary_indexes(collection_names)
+    try:
+        yield
+    finally:
+        create_indexes()
+
+
 def sync_quiz_attempt_to_mongo(attempt_obj):
     """
     Sync quiz attempt to MongoDB for analytics and backup
@@ -150,7 +150,14 @@ class PineconeDBManager:
                 # Prepare batch data
                 vectors_to_upsert = []
                 
-                for chunk in batch:
+                # Generate embeddings for the whole batch in one call
+                embeddings = embedding_model.encode(
+                    [chunk['text'] for chunk in batch],
+                    batch_size=64,
+                    convert_to_numpy=True
+                ).tolist()
+                
+                for chunk, embedding in zip(batch, embeddings):
                     # Create unique ID with clear labeling
                     chunk_id = (
                         f"class_{standard}_"
@@ -171,9 +178,6 @@ class PineconeDBManager:
                         'content_type': chunk.get('content_type', 'general')
                     })
                     
-                    # Generate embedding
-                    embedding = embedding_model.encode([chunk['text']])[0].tolist()
-                    
                     # Prepare vector
                     vectors_to_upsert.append({
                         'id': chunk_id,
@@ -88,17 +88,8 @@ WSGI_APPLICATION = 'ncert_project.wsgi.application'
 # Using direct PyMongo for application data + SQLite for Django admin
 MONGODB_URI = os.getenv('MONGODB_URI', 'mongodb://localhost:27017/')
 MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'ncert_learning_db')
-
-# Initialize MongoDB connection
-from pymongo import MongoClient
-try:
-    _mongo_client = MongoClient(MONGODB_URI, serverSelectionTimeoutMS=5000)
-    _mongo_client.admin.command('ping')
-    _mongo_db = _mongo_client[MONGODB_DB_NAME]
-    print(f"✅ MongoDB Atlas connected: {MONGODB_DB_NAME}")
-except Exception as e:
-    print(f"⚠️  MongoDB connection issue: {e}")
-    _mongo_db = None
+# Connections per process in the shared MongoClient (mongodb_utils.MongoDBManager)
+MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', '50'))
 
 # SQLite for Django admin panel (sessions, admin logs, contenttypes)
 # This is minimal - only Django's internal tables
@@ -106,9 +97,25 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections open between requests (seconds; 0 = close after
+        # each request). Under gevent/eventlet workers every greenlet holds
+        # its own connection - set DJANGO_CONN_MAX_AGE=0 there.
+        'CONN_MAX_AGE': int(os.getenv('DJANGO_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Shared cache (e.g. redis://localhost:6379/1). The ChatCache front cache and
+# its hit counters only switch on with a backend every worker can see
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+if CACHE_REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_REDIS_URL,
+        }
+    }
+
 # Strategy: 
 # - Django admin/sessions → SQLite (lightweight, works out of box)
 # - ALL application data → MongoDB Atlas (users, quizzes, chat, etc.)
@@ -187,6 +194,10 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 # ChromaDB Configuration
 CHROMA_PERSIST_DIRECTORY = str(BASE_DIR / 'chromadb_data')
 CHROMA_COLLECTION_NAME = 'ncert_documents'
+CHROMA_MCQ_CACHE_COLLECTION = 'quiz_mcq_cache'
+# Optional Chroma server (e.g. http://localhost:8000). When set, documents are
+# written over HTTP and HNSW indexing happens server-side instead of in-process
+CHROMA_HTTP_URL = os.getenv('CHROMA_HTTP_URL', '')
 
 # Celery Configuration
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
@@ -197,6 +208,26 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
+CELERY_BEAT_SCHEDULE = {
+    # Stale ChatCache rows are skipped on read and deleted here in batches
+    'purge-expired-chatcache': {
+        'task': 'students.tasks.purge_expired_chatcache',
+        'schedule': 10 * 60,  # every 10 minutes
+    },
+    # Front-cache hit counts are kept in the shared cache and written here
+    'drain-chat-cache-hits': {
+        'task': 'students.tasks.drain_chat_cache_hits',
+        'schedule': 60,  # every minute
+    },
+    'purge-stale-quiz-attempts': {
+        'task': 'students.tasks.purge_stale_quiz_attempts',
+        'schedule': 24 * 60 * 60,  # daily
+    },
+    'purge-old-chat-history': {
+        'task': 'students.tasks.purge_old_chat_history',
+        'schedule': 24 * 60 * 60,  # daily
+    },
+}
 
 # Logging Configuration
 LOGGING = {
@@ -2,6 +2,7 @@
 Unified Vector Database Interface
 Automatically switches between ChromaDB and Pinecone based on VECTOR_DB environment variable
 """
+import functools
 import os
 import logging
 from typing import List, Dict, Optional
@@ -11,10 +12,15 @@ logger = logging.getLogger(__name__)
 # Determine which vector database to use
 VECTOR_DB = os.getenv('VECTOR_DB', 'chromadb').lower()
 
+# Display name of the configured vector database, for log and status messages
+VECTOR_DB_NAME = 'Pinecone' if VECTOR_DB == 'pinecone' else 'ChromaDB'
 
+
+@functools.lru_cache(maxsize=1)
 def get_vector_db_manager():
     """
     Get the appropriate vector database manager based on configuration
+    Resolved once per process - both managers are process-wide singletons
     
     Returns:
         ChromaDBManager or PineconeDBManager instance
@@ -10,32 +10,47 @@ from typing import Tuple
 logger = logging.getLogger('students')
 
 
+# Signal patterns are fused into one case-insensitive regex each, so a
+# message is scanned once without building a lowercased copy of it
+_CONFUSION_RE = re.compile('|'.join([
+    r'\b(?:don\'t|dont|do not) understand\b',
+    r'\bconfused?\b',
+    r'\bexplain (?:simpler|simple|easier|easy|basic|clearly)\b',
+    r'\bI\'m lost\b',
+    r'\btoo (?:hard|difficult|complex|complicated)\b',
+    r'\bcan you (?:simplify|make it simple|explain better)\b',
+    r'\bnot clear\b',
+    r'\bwhat (?:do|does) (?:that|this|it) mean\b',
+    r'\bin simple (?:words|terms|language)\b',
+    r'\blike I\'m \d+(?: years old)?\b',  # "explain like I'm 5"
+    r'\bstep by step\b',
+    r'\bbreak it down\b',
+]), re.IGNORECASE)
+
+_ADVANCED_RE = re.compile('|'.join([
+    r'\b(?:more|further) details?\b',
+    r'\b(?:deeper|in depth)\b',
+    r'\btechnical(?:ly)?\b',
+    r'\badvanced (?:explanation|concept)\b',
+    r'\bprofessional\b',
+    r'\bscientific (?:terms|explanation)\b',
+    r'\bprecise(?:ly)?\b',
+    r'\bexact definition\b',
+]), re.IGNORECASE)
+
+_SIMPLE_WORDS = ('what', 'simple', 'easy', 'basic')
+_ADVANCED_WORDS = ('advanced', 'complex', 'detailed', 'technical')
+
+
 def detect_confusion_signals(message: str) -> bool:
     """
     Detect if user is confused or needs simpler explanation
     Returns True if confusion signals found
     """
-    confusion_patterns = [
-        r'\b(don\'t|dont|do not) understand\b',
-        r'\bconfuse(d)?\b',
-        r'\bexplain (simpler|simple|easier|easy|basic|clearly)\b',
-        r'\bI\'m lost\b',
-        r'\btoo (hard|difficult|complex|complicated)\b',
-        r'\bcan you (simplify|make it simple|explain better)\b',
-        r'\bnot clear\b',
-        r'\bwhat (do|does) (that|this|it) mean\b',
-        r'\bin simple (words|terms|language)\b',
-        r'\blike I\'m \d+( years old)?\b',  # "explain like I'm 5"
-        r'\bstep by step\b',
-        r'\bbreak it down\b',
-    ]
-    
-    message_lower = message.lower()
-    
-    for pattern in confusion_patterns:
-        if re.search(pattern, message_lower):
-            logger.info(f"Confusion detected: {pattern}")
-            return True
+    match = _CONFUSION_RE.search(message)
+    if match:
+        logger.info(f"Confusion detected: {match.group(0)}")
+        return True
     
     return False
 
@@ -45,23 +60,10 @@ def detect_advanced_request(message: str) -> bool:
     Detect if user wants more advanced/detailed explanation
     Returns True if advanced signals found
     """
-    advanced_patterns = [
-        r'\b(more|further) detail(s)?\b',
-        r'\b(deeper|in depth)\b',
-        r'\btechnical(ly)?\b',
-        r'\badvanced (explanation|concept)\b',
-        r'\bprofessional\b',
-        r'\bscientific (terms|explanation)\b',
-        r'\bprecise(ly)?\b',
-        r'\bexact definition\b',
-    ]
-    
-    message_lower = message.lower()
-    
-    for pattern in advanced_patterns:
-        if re.search(pattern, message_lower):
-            logger.info(f"Advanced request detected: {pattern}")
-            return True
+    match = _ADVANCED_RE.search(message)
+    if match:
+        logger.info(f"Advanced request detected: {match.group(0)}")
+        return True
     
     return False
 
@@ -81,9 +83,10 @@ def infer_difficulty_from_history(user_questions: list) -> str:
     advanced_count = 0
     
     for q in recent_questions:
-        if any(word in q.lower() for word in ['what', 'simple', 'easy', 'basic']):
+        q_folded = q.casefold()  # Fold once, reuse for both checks
+        if any(word in q_folded for word in _SIMPLE_WORDS):
             simple_count += 1
-        if any(word in q.lower() for word in ['advanced', 'complex', 'detailed', 'technical']):
+        if any(word in q_folded for word in _ADVANCED_WORDS):
             advanced_count += 1
     
     if advanced_count > simple_count:
@@ -117,13 +120,8 @@ def determine_difficulty_level(current_message: str, chat_history: list = None)
     return 'normal'
 
 
-def adjust_prompt_for_difficulty(base_prompt: str, difficulty: str, user_context: str = "") -> str:
-    """
-    Adjust the AI prompt based on difficulty level
-    Adds instructions to simplify or elaborate
-    """
-    difficulty_instructions = {
-        'simple': """
+_DIFFICULTY_INSTRUCTIONS = {
+    'simple': """
 🎯 IMPORTANT: The user is confused or needs a simpler explanation.
 - Use very simple language (like explaining to a 5th grader)
 - Break down complex concepts into small, easy steps
@@ -133,15 +131,15 @@ def adjust_prompt_for_difficulty(base_prompt: str, difficulty: str, user_context
 - Add emoji to make it friendly 😊
 - Explain one concept at a time
         """,
-        
-        'normal': """
+    
+    'normal': """
 📚 Provide a clear, balanced explanation suitable for NCERT students.
 - Use grade-appropriate language
 - Include relevant examples
 - Balance detail with clarity
         """,
-        
-        'advanced': """
+    
+    'advanced': """
 🎓 The user wants a detailed, advanced explanation.
 - Use proper technical terminology
 - Provide in-depth analysis
@@ -149,18 +147,27 @@ def adjust_prompt_for_difficulty(base_prompt: str, difficulty: str, user_context
 - Reference advanced concepts
 - Assume higher comprehension level
         """
-    }
-    
-    instruction = difficulty_instructions.get(difficulty, difficulty_instructions['normal'])
-    
-    adjusted_prompt = f"""{instruction}
+}
 
-{base_prompt}
+_PROMPT_TEMPLATE = "{instruction}\n\n{base_prompt}\n\n{user_context}\n"
 
-{user_context if user_context else ""}
-"""
+_SIMPLE_RESPONSE_TEMPLATE = "Let me explain this simply:\n\n{content}\n\n💡 **Key Point:** Remember, take it one step at a time!"
+_SIMPLE_STEPS_SUFFIX = "\n\n😊 Does this make sense now?"
+_ADVANCED_RESPONSE_TEMPLATE = "**Detailed Explanation:**\n\n{content}\n\n📖 **Further Reading:** Explore related advanced topics for deeper understanding."
+
+
+def adjust_prompt_for_difficulty(base_prompt: str, difficulty: str, user_context: str = "") -> str:
+    """
+    Adjust the AI prompt based on difficulty level
+    Adds instructions to simplify or elaborate
+    """
+    instruction = _DIFFICULTY_INSTRUCTIONS.get(difficulty, _DIFFICULTY_INSTRUCTIONS['normal'])
     
-    return adjusted_prompt
+    return _PROMPT_TEMPLATE.format(
+        instruction=instruction,
+        base_prompt=base_prompt,
+        user_context=user_context or ""
+    )
 
 
 def format_response_by_difficulty(content: str, difficulty: str) -> str:
@@ -172,12 +179,12 @@ def format_response_by_difficulty(content: str, difficulty: str) -> str:
         # Add step numbers if not present
         if 'step' not in content.lower():
             # Simple formatting
-            formatted = f"Let me explain this simply:\n\n{content}\n\n💡 **Key Point:** Remember, take it one step at a time!"
+            formatted = _SIMPLE_RESPONSE_TEMPLATE.format(content=content)
         else:
-            formatted = content + "\n\n😊 Does this make sense now?"
+            formatted = content + _SIMPLE_STEPS_SUFFIX
     
     elif difficulty == 'advanced':
-        formatted = f"**Detailed Explanation:**\n\n{content}\n\n📖 **Further Reading:** Explore related advanced topics for deeper understanding."
+        formatted = _ADVANCED_RESPONSE_TEMPLATE.format(content=content)
     
     else:
         # Normal - no special formatting
@@ -0,0 +1,39 @@
+"""
+Custom model fields for the students app
+"""
+import json
+import zlib
+
+from django.db import models
+
+JSON_COMPRESSION_LEVEL = 6
+
+
+class CompressedJSONField(models.BinaryField):
+    """
+    JSON stored as zlib-compressed bytes
+    For blobs that are only ever written and read whole - nothing can filter
+    on the contents, so don't use it for fields that are queried by key
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return json.loads(zlib.decompress(bytes(value)))
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return json.loads(zlib.decompress(bytes(value)))
+        if isinstance(value, str):
+            # JSON text from value_to_string (dumpdata/loaddata)
+            return json.loads(value)
+        return value
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+        return zlib.compress(data, JSON_COMPRESSION_LEVEL)
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj), ensure_ascii=False)
@@ -4,19 +4,237 @@ Improved Quiz Generation System
 - Better ChromaDB chunking with proper chapter mapping
 - Age-appropriate question generation
 """
+import asyncio
+import functools
+import hashlib
 import logging
 import re
 import json
-from typing import List, Dict, Optional
+import math
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import List, Dict, AsyncIterable, AsyncIterator, Iterable, Iterator, Optional
 import openai
 import google.generativeai as genai
 import os
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ncert_project.vector_db_utils import VECTOR_DB_NAME, get_vector_db_manager
+from students.models import QuizChapter, QuizQuestion, QuestionVariant, QuizAnswer
+from students.quiz_generator import generate_mcq_questions_with_ai
 
 logger = logging.getLogger('students')
 
 
-def extract_let_us_reflect_questions(content: str) -> List[Dict]:
+# Comprehensive headers for all NCERT question sections (Class 5-10), fused
+# into one case-insensitive alternation so chapter text is scanned once
+_SECTION_HEADERS = [
+    # Primary reflection sections
+    r'Let us reflect',
+    # Activity sections
+    r'Activity',
+    # Discussion prompts ("Discuss" also covers "Let's discuss" / "Let us discuss")
+    r'Do you know',
+    r'Discuss',
+    # Standard question sections ("Questions" also covers "Review Questions"
+    # and "Summary Questions" - the body starts after the header either way)
+    r'Think and Answer',
+    r'Check your progress',
+    r'Questions',
+    r'Exercise',
+    # End-of-chapter sections
+    r'Chapter Review',
+]
+
+# Only the headers are matched by regex; each section body is then sliced up to
+# the next blank line with str.find, so no lazy DOTALL scan runs over the text
+_SECTION_HEADER_RE = re.compile(
+    r'(?:' + '|'.join(_SECTION_HEADERS) + r')[:\s\?]*',
+    re.IGNORECASE
+)
+
+# Headers are plain words, so a lowercase substring check can rule a chunk out
+# before any regex runs (most chunks have no question section at all)
+_SECTION_HEADER_LITERALS = tuple(h.lower() for h in _SECTION_HEADERS)
+
+# Hyperscan is optional; when installed, all headers are found in one DFA pass
+# and _SECTION_HEADER_RE is only the fallback
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+
+def _compile_section_header_db():
+    """Compile the section headers into a Hyperscan database (None if unavailable)"""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[h.encode() for h in _SECTION_HEADERS],
+            ids=list(range(len(_SECTION_HEADERS))),
+            elements=len(_SECTION_HEADERS),
+            flags=hyperscan.HS_FLAG_CASELESS,
+        )
+        return db
+    except Exception as e:
+        logger.warning(f"[WARNING]  Hyperscan unavailable, using re for section headers: {e}")
+        return None
+
+
+_SECTION_HEADER_DB = _compile_section_header_db()
+
+# Hyperscan scratch space must not be shared between concurrent scans
+_hyperscan_local = threading.local()
+
+
+def _iter_section_headers(content: str) -> Iterator[tuple]:
+    """
+    Yield (start, end) of every section header in content, ordered by start
+    The end includes the trailing ':', '?' and whitespace, as in _SECTION_HEADER_RE
+    """
+    if _SECTION_HEADER_DB is None:
+        lowered = content.lower()
+        if not any(header in lowered for header in _SECTION_HEADER_LITERALS):
+            return
+        for match in _SECTION_HEADER_RE.finditer(content):
+            yield match.start(), match.end()
+        return
+    
+    data = content.encode('utf-8')
+    hits = []
+    
+    def on_match(pattern_id, start, end, flags, context):
+        hits.append((end - len(_SECTION_HEADERS[pattern_id]), end))
+    
+    scratch = getattr(_hyperscan_local, 'scratch', None)
+    if scratch is None:
+        scratch = _hyperscan_local.scratch = hyperscan.Scratch(_SECTION_HEADER_DB)
+    _SECTION_HEADER_DB.scan(data, match_event_handler=on_match, scratch=scratch)
+    
+    # Hyperscan reports byte offsets; headers are ASCII, so only non-ASCII
+    # text before a header needs mapping back to str offsets. Hits are sorted,
+    # so each offset is found by decoding just the bytes since the previous one
+    ascii_only = content.isascii()
+    content_len = len(content)
+    byte_pos = char_pos = 0
+    
+    def to_char_offset(offset):
+        nonlocal byte_pos, char_pos
+        if offset >= byte_pos:
+            char_pos += len(data[byte_pos:offset].decode('utf-8'))
+        else:
+            char_pos -= len(data[offset:byte_pos].decode('utf-8'))
+        byte_pos = offset
+        return char_pos
+    
+    for start, end in sorted(hits):
+        if not ascii_only:
+            start = to_char_offset(start)
+            end = to_char_offset(end)
+        while end < content_len and (content[end] in ':?' or content[end].isspace()):
+            end += 1
+        yield start, end
+
+# Numbered-question markers ("1.", " 2. ") at the start of a line. Section
+# bodies are split on these, which is linear - no backtracking lookahead
+_QUESTION_SPLIT_RE = re.compile(r'^\s*\d+\.\s*', re.MULTILINE)
+
+# Optional markdown fence around a model's JSON output
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*(?:```)?\s*$', re.DOTALL)
+
+# JSON repair passes for malformed model output
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_UNQUOTED_KEY_RE = re.compile(r'(\{|,)\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:')
+_LINE_COMMENT_RE = re.compile(r'//.*?\n')
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+# Chapter content sent with the MCQ prompt is capped at this many tokens
+PROMPT_CONTEXT_TOKENS = 2000
+
+# The fallback generator only reads the start of the chapter content
+FALLBACK_CONTENT_CHARS = 4000
+
+# Vector DB chunks per chapter are cached for a day; uploads invalidate them
+CHAPTER_DOCUMENTS_CACHE_TTL = 60 * 60 * 24
+
+# MCQ conversion model - a non-thinking flash model, so the output budget
+# below is spent on the answer rather than on reasoning tokens
+MCQ_MODEL = 'gemini-2.0-flash'
+
+# Bump whenever build_prompt or the MCQ format changes. Cached MCQ sets are
+# keyed on this and the model, so a new prompt or model never serves old MCQs
+MCQ_PROMPT_VERSION = 2
+MCQ_CACHE_VERSION = f"{MCQ_MODEL}:prompt-v{MCQ_PROMPT_VERSION}"
+
+# Output budget per MCQ line (5 variants with options and short explanations).
+# Long lines overran 650 tokens and got truncated, so this keeps wide headroom
+MCQ_OUTPUT_TOKENS_PER_QUESTION = 1100
+
+# Output limit of MCQ_MODEL - a response can't be longer than this, so a full
+# chapter can need a follow-up request for the MCQs that didn't fit
+MCQ_MAX_OUTPUT_TOKENS = 8192
+
+# OpenAI model for Batch API jobs when the Gemini batch SDK isn't installed
+OPENAI_BATCH_MODEL = 'gpt-4o-mini'
+
+# Validated MCQs are cached per prompt for a week, so re-runs skip the API
+LLM_RESPONSE_CACHE_TTL = 60 * 60 * 24 * 7
+
+_WORD_RE = re.compile(r'\w+')
+# Punctuation and whitespace runs, ignored when comparing question texts
+_NON_WORD_RE = re.compile(r'\W+')
+
+# Allowed values for generated MCQs (mirrors QuestionVariant / QuizQuestion)
+_OPTION_KEYS = ('A', 'B', 'C', 'D')
+_DIFFICULTIES = {'easy', 'medium', 'hard'}
+
+# Textbook questions that already are MCQs: "(a) ...", "b) ...", "C. ..." option
+# lines plus an answer key on its own line after them ("Answer: (b)"). The
+# separator is required so prose like "Answer a few questions" never matches
+_NATIVE_OPTION_RE = re.compile(r'^\s*\(?([A-Da-d])[\)\.]\s*(.+)$', re.MULTILINE)
+_NATIVE_ANSWER_RE = re.compile(
+    r'^\s*(?:Answer|Ans)\b\.?\s*[:\-]\s*\(?([A-D])\)?\s*$',
+    re.MULTILINE | re.IGNORECASE
+)
+
+# orjson is optional; its JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+@functools.lru_cache(maxsize=1)
+def _get_clients():
+    """
+    Configure the AI SDKs once per process instead of on every call
+    Returns (openai_api_key, gemini_api_key)
+    """
+    openai_api_key = os.getenv("OPENAI_API_KEY")
+    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if openai_api_key:
+        openai.api_key = openai_api_key
+    if gemini_api_key:
+        genai.configure(api_key=gemini_api_key)
+    return openai_api_key, gemini_api_key
+
+
+def extract_let_us_reflect_questions(content: str, limit: int = 10) -> List[Dict]:
+    """
+    Extract textbook section questions from a single block of text
+    """
+    return extract_questions_from_documents([content], limit=limit)
+
+
+def extract_questions_from_documents(documents: List[str], limit: int = 10) -> List[Dict]:
     """
     Extract questions from textbook special sections
     - Let us reflect
@@ -25,221 +243,298 @@ def extract_let_us_reflect_questions(content: str) -> List[Dict]:
     - Discuss / Let's discuss
     - End-of-chapter questions
     These are high-quality questions already in the book
+    
+    Documents are scanned one by one (e.g. the vector DB chunks of a chapter).
+    Overlapping sections can repeat a question, so duplicates (ignoring case,
+    punctuation and whitespace) are dropped and at most `limit` questions are returned
     """
     questions = []
+    seen = set()
     
-    # Comprehensive patterns for all NCERT question sections (Class 5-10)
-    patterns = [
-        # Primary reflection sections
-        r'Let us reflect[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Let Us Reflect[:\s]*(.*?)(?=\n\n|\Z)',
-        
-        # Activity sections
-        r'Activity[:\s]*(.*?)(?=\n\n|\Z)',
-        r'ACTIVITY[:\s]*(.*?)(?=\n\n|\Z)',
-        
-        # Discussion prompts
-        r'Do you know[:\s\?]*(.*?)(?=\n\n|\Z)',
-        r'Do You Know[:\s\?]*(.*?)(?=\n\n|\Z)',
-        r'Discuss[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Let\'s discuss[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Let us discuss[:\s]*(.*?)(?=\n\n|\Z)',
-        
-        # Standard question sections
-        r'Think and Answer[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Check your progress[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Questions[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Exercise[:\s]*(.*?)(?=\n\n|\Z)',
-        r'EXERCISE[:\s]*(.*?)(?=\n\n|\Z)',
-        
-        # End-of-chapter sections
-        r'Review Questions[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Chapter Review[:\s]*(.*?)(?=\n\n|\Z)',
-        r'Summary Questions[:\s]*(.*?)(?=\n\n|\Z)',
-    ]
-    
-    for pattern in patterns:
-        matches = re.finditer(pattern, content, re.IGNORECASE | re.DOTALL)
-        for match in matches:
-            section_content = match.group(1)
+    # Chunks rarely split a section, so each document is scanned on its own
+    # instead of regexing one large joined string
+    for content in documents:
+        content_len = len(content)
+        pos = 0
+        
+        for header_start, body_start in _iter_section_headers(content):
+            # Headers inside an already-consumed section are skipped
+            if header_start < pos:
+                continue
             
-            # Extract numbered questions
-            question_pattern = r'\d+\.\s*([^\n]+(?:\n(?!\d+\.)[^\n]+)*)'
-            question_matches = re.findall(question_pattern, section_content)
+            # Section runs from the end of the header to the next blank line
+            body_end = content.find('\n\n', body_start)
+            if body_end == -1:
+                body_end = content_len
+            section_content = content[body_start:body_end]
+            pos = body_end
             
-            for q_text in question_matches:
+            # Extract numbered questions - text before the first number is
+            # not a question, each later piece runs up to the next number
+            for q_text in _QUESTION_SPLIT_RE.split(section_content)[1:]:
                 q_text = q_text.strip()
-                if len(q_text) > 20:  # Filter out very short matches
-                    questions.append({
-                        'text': q_text,
-                        'source': 'textbook_reflect_section'
-                    })
+                if len(q_text) <= 20:  # Filter out very short matches
+                    continue
+                
+                key = _NON_WORD_RE.sub(' ', q_text.casefold()).strip()
+                if key in seen:
+                    continue
+                seen.add(key)
+                
+                questions.append({
+                    'text': q_text,
+                    'source': 'textbook_reflect_section'
+                })
+                if len(questions) == limit:
+                    return questions
     
     return questions
 
 
-def generate_mcqs_from_textbook_questions(textbook_questions: List[Dict], content: str, class_num: str) -> List[Dict]:
+def _validate_mcq(item) -> Optional[Dict]:
     """
-    Convert textbook questions into MCQs with AI
+    Check one model-generated MCQ against the schema the quiz tables need
+    Returns a normalized copy, or None if nothing usable is left. Bad variants
+    are dropped one by one so a single malformed variant doesn't lose the question.
     """
-    if not textbook_questions:
-        return []
+    if not isinstance(item, dict) or not isinstance(item.get('variants'), list):
+        logger.warning("[WARNING]  Skipping MCQ without a variants list")
+        return None
     
-    try:
-        openai.api_key = os.getenv("OPENAI_API_KEY")
-        gemini_api_key = os.getenv("GEMINI_API_KEY")
-        if gemini_api_key:
-            genai.configure(api_key=gemini_api_key)
-        
-        # Age-appropriate settings
-        class_number = int(''.join(filter(str.isdigit, str(class_num))))
-        if class_number <= 5:
-            language_level = "very simple language for 10-11 year olds"
-        elif class_number <= 8:
-            language_level = "moderate language for 12-14 year olds"
-        else:
-            language_level = "advanced language for 15+ year olds"
-        
-        # Prepare questions for AI - EXACTLY 10 questions needed
-        questions_text = "\n".join([f"{i+1}. {q['text']}" for i, q in enumerate(textbook_questions[:10])])
-        
-        prompt = f"""You are converting textbook reflection questions into MCQs for Class {class_num} students.
+    variants = []
+    for variant in item['variants']:
+        if not isinstance(variant, dict):
+            continue
+        question = variant.get('question')
+        options = variant.get('options')
+        correct = str(variant.get('correct') or '').strip().upper()[:1]
+        if (not isinstance(question, str) or not question.strip()
+                or not isinstance(options, dict)
+                or any(options.get(key) in (None, '') for key in _OPTION_KEYS)
+                or correct not in _OPTION_KEYS):
+            continue
+        variants.append({
+            'question': question.strip(),
+            'options': {key: str(options[key])[:500] for key in _OPTION_KEYS},
+            'correct': correct,
+            'explanation': str(variant.get('explanation') or ''),
+        })
+    
+    if not variants:
+        logger.warning("[WARNING]  Skipping MCQ with no valid variants")
+        return None
+    
+    difficulty = str(item.get('difficulty') or 'medium').strip().lower()
+    return {
+        'original_question': str(item.get('original_question') or ''),
+        'topic': str(item.get('topic') or 'General')[:255],
+        'difficulty': difficulty if difficulty in _DIFFICULTIES else 'medium',
+        'rag_context': str(item.get('rag_context') or ''),
+        'variants': variants,
+    }
 
-TEXTBOOK QUESTIONS (from "Let us reflect", "Activity", "Discuss", "Do you know" sections):
-{questions_text}
 
-CHAPTER CONTENT (includes OCR-extracted text from diagrams, maps, charts):
-{content[:3000]}
+def _validated_mcqs(items: Iterable) -> List[Dict]:
+    """Validate a batch of MCQs, keeping only the usable ones"""
+    validated = (_validate_mcq(item) for item in items)
+    return [item for item in validated if item is not None]
 
-TASK: Convert EACH question into a 4-option MCQ with EXACTLY 5 variants.
 
-CRITICAL REQUIREMENTS:
-1. Generate EXACTLY 10 QUESTIONS (if textbook has fewer, create content-based questions to reach 10)
-2. Each question MUST have EXACTLY 5 VARIANTS (different wording, same concept)
-3. Use {language_level}
-4. Keep the original question's intent and difficulty
-5. Create exactly 4 options (A, B, C, D) per question
-6. Extract relevant RAG context from the content
-7. Mix difficulty: label as easy/medium/hard based on original question complexity
-8. EXPLANATIONS: Keep SHORT (2-3 sentences max), simple, plain text - NO markdown (no *, #, **, _)
-9. **IMPORTANT**: Consider image content (diagrams, maps, charts) extracted via OCR - create visual/diagram-based questions too
+def try_parse_native_mcq(text: str) -> Optional[Dict]:
+    """
+    Turn a textbook question that is already multiple choice into an MCQ
+    Needs exactly four (a)-(d) / A.-D. option lines and an answer line such as
+    "Answer: (b)"; textbook MCQs without an answer key still go to the LLM.
+    """
+    option_matches = list(_NATIVE_OPTION_RE.finditer(text))
+    options = dict(
+        (match.group(1).upper(), match.group(2).strip())
+        for match in option_matches
+    )
+    if len(options) != 4 or set(options) != set(_OPTION_KEYS):
+        return None
+    
+    # The answer key only counts after the last option line
+    answer = _NATIVE_ANSWER_RE.search(text, option_matches[-1].end())
+    if not answer:
+        return None
+    
+    question = text[:option_matches[0].start()].strip()
+    if not question:
+        return None
+    
+    correct = answer.group(1).upper()
+    return {
+        'original_question': question,
+        'topic': 'General',
+        'difficulty': 'medium',
+        'rag_context': '',
+        'variants': [{
+            'question': question,
+            'options': options,
+            'correct': correct,
+            'explanation': f"The textbook answer is {correct}: {options[correct]}.",
+        }],
+    }
 
-IMAGE-BASED QUESTION TYPES (if content has diagrams):
-- "Based on the diagram, what is a dune?"
-- "According to the rivers map, which landform is formed by wind?"
-- "Looking at the water cycle chart, where does evaporation occur?"
 
-EXPLANATION RULES:
-[OK] GOOD: "The answer is B because rivers flow from mountains to the sea. Water always moves downward due to gravity."
-[ERROR] BAD: "**Rivers flow from mountains to the sea.** This is because of *gravity* which pulls water downward. Rivers start high up..."
+def _split_native_mcqs(textbook_questions: List[Dict]):
+    """
+    Partition textbook questions into ready-made MCQs and ones the LLM must convert
+    """
+    native_mcqs = []
+    needs_llm = []
+    for q in textbook_questions:
+        mcq = try_parse_native_mcq(q['text'])
+        if mcq is not None:
+            native_mcqs.append(mcq)
+        else:
+            needs_llm.append(q)
+    if native_mcqs:
+        logger.info(f"[OK] {len(native_mcqs)} textbook questions are already MCQs - no LLM needed for them")
+    return native_mcqs, needs_llm
 
-OUTPUT FORMAT (JSON) - MUST return array with exactly 10 questions:
-[
-  {{
-    "original_question": "Original textbook question",
-    "topic": "Topic name",
-    "difficulty": "easy|medium|hard",
-    "rag_context": "Relevant content quote",
-    "variants": [
-      {{
-        "question": "MCQ version of the question?",
-        "options": {{
-          "A": "First option",
-          "B": "Second option",
-          "C": "Third option",
-          "D": "Fourth option"
-        }},
-        "correct": "B",
-        "explanation": "Why B is correct with reference to content"
-      }},
-      {{
-        "question": "Variant 2 wording?",
-        "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}},
-        "correct": "C",
-        "explanation": "Explanation for variant 2"
-      }},
-      {{
-        "question": "Variant 3 wording?",
-        "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}},
-        "correct": "A",
-        "explanation": "Explanation for variant 3"
-      }},
-      {{
-        "question": "Variant 4 wording?",
-        "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}},
-        "correct": "D",
-        "explanation": "Explanation for variant 4"
-      }},
-      {{
-        "question": "Variant 5 wording?",
-        "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}},
-        "correct": "B",
-        "explanation": "Explanation for variant 5"
-      }}
-    ]
-  }},
-  ... (repeat for all 10 questions - total of 10 questions × 5 variants = 50 total variants)
-]
 
-IMPORTANT: You MUST return exactly 10 questions. If textbook has less than 10 "Let us reflect" questions, create additional questions from the chapter content to reach exactly 10 questions.
+def _parse_ndjson_line(line: str) -> Optional[Dict]:
+    """Parse one streamed NDJSON line, None for blanks and malformed lines"""
+    line = line.strip().rstrip(',')
+    if not line.startswith('{'):
+        return None  # Blank line, stray fence or chatter
+    try:
+        return _json_loads(line)
+    except json.JSONDecodeError as e:
+        logger.warning(f"[WARNING]  Skipping malformed streamed MCQ: {e.msg}")
+        return None
 
-[WARNING]  CRITICAL JSON FORMATTING:
-1. Use ONLY double quotes (") - NO single quotes (')
-2. NO trailing commas before closing brackets
-3. Escape special characters in text (use \\" for quotes inside strings)
-4. NO comments (// or /* */)
-5. Ensure all brackets are properly closed
-6. Test your JSON is valid before returning
 
-Return ONLY the JSON array - no markdown, no extra text."""
-        
-        # Use Gemini with retry logic
-        result_text = None
-        max_retries = 3
-        
-        if gemini_api_key:
-            for attempt in range(max_retries):
-                try:
-                    model = genai.GenerativeModel('gemini-2.5-flash')
-                    response = model.generate_content(
-                        prompt,
-                        generation_config={
-                            'temperature': 0.3 if attempt == 0 else 0.1,  # Lower temp on retry
-                            'top_p': 0.8,
-                            'top_k': 40,
-                        }
-                    )
-                    result_text = response.text
-                    logger.info(f"[OK] Gemini converted textbook questions to MCQs (attempt {attempt + 1})")
-                    break  # Success, exit retry loop
-                except Exception as e:
-                    logger.warning(f"[WARNING]  Gemini attempt {attempt + 1} failed: {e}")
-                    if attempt == max_retries - 1:
-                        logger.error(f"[ERROR] All Gemini attempts failed")
-                        return []
-                    import time
-                    time.sleep(1)  # Brief pause before retry
-        
-        if not result_text:
-            logger.error("[ERROR] No AI service available")
-            return []
-        
-        # Parse JSON
-        result_text = result_text.strip()
-        if result_text.startswith('```json'):
-            result_text = result_text[7:]
-        if result_text.startswith('```'):
-            result_text = result_text[3:]
-        if result_text.endswith('```'):
-            result_text = result_text[:-3]
-        result_text = result_text.strip()
-        
-        # Try to parse JSON with error recovery
-        questions = None
+def _iter_ndjson_items(pieces: Iterable[str]) -> Iterator[Dict]:
+    """
+    Incrementally split a streamed NDJSON response into MCQ objects
+    Each line is parsed as soon as its newline arrives; the fragments of the
+    line in flight are kept in a list and joined once.
+    """
+    line_parts = []
+    
+    for piece in pieces:
+        *complete, tail = piece.split('\n')
+        for part in complete:
+            line_parts.append(part)
+            question = _parse_ndjson_line(''.join(line_parts))
+            line_parts = []
+            if question is not None:
+                yield question
+        line_parts.append(tail)
+    
+    question = _parse_ndjson_line(''.join(line_parts))
+    if question is not None:
+        yield question
+
+
+async def _aiter_ndjson_items(pieces: AsyncIterable[str]) -> AsyncIterator[Dict]:
+    """
+    Async twin of _iter_ndjson_items for streamed async responses
+    """
+    line_parts = []
+    
+    async for piece in pieces:
+        *complete, tail = piece.split('\n')
+        for part in complete:
+            line_parts.append(part)
+            question = _parse_ndjson_line(''.join(line_parts))
+            line_parts = []
+            if question is not None:
+                yield question
+        line_parts.append(tail)
+    
+    question = _parse_ndjson_line(''.join(line_parts))
+    if question is not None:
+        yield question
+
+
+def _parse_json_objects(text: str) -> List[Dict]:
+    """
+    Parse a run of JSON objects (NDJSON, or objects spread over several lines)
+    Stops at the first undecodable object and returns what was parsed so far
+    """
+    decoder = json.JSONDecoder()
+    objects = []
+    idx = 0
+    while True:
+        idx = text.find('{', idx)
+        if idx == -1:
+            break
         try:
-            questions = json.loads(result_text)
+            obj, idx = decoder.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            break
+        objects.append(obj)
+    return objects
+
+
+def _outer_json_array(text: str) -> Optional[str]:
+    """
+    Return the outermost [...] in text using a bracket-depth scan that ignores
+    brackets inside strings, or None if no complete array is found
+    """
+    start = text.find('[')
+    if start == -1:
+        return None
+    
+    depth = 0
+    in_string = False
+    escaped = False
+    for idx in range(start, len(text)):
+        ch = text[idx]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '[{':
+            depth += 1
+        elif ch in ']}':
+            depth -= 1
+            if depth == 0:
+                return text[start:idx + 1]
+    
+    return None
+
+
+def _parse_mcq_json(result_text: str) -> List[Dict]:
+    """
+    Parse a complete MCQ JSON response, repairing common formatting errors
+    """
+    # Strip an optional ```json ... ``` fence in a single pass
+    match = _FENCE_RE.match(result_text)
+    result_text = match.group(1) if match else result_text.strip()
+    
+    # NDJSON - one MCQ object per line (the prompt's output contract)
+    if result_text.startswith('{'):
+        questions = _parse_json_objects(result_text)
+        if questions:
             logger.info(f"[OK] Generated {len(questions)} MCQs from textbook questions")
-        except json.JSONDecodeError as e:
+            return questions
+    
+    # Otherwise the model returned a JSON array - parse it with error recovery
+    questions = None
+    try:
+        questions = _json_loads(result_text)
+        logger.info(f"[OK] Generated {len(questions)} MCQs from textbook questions")
+    except json.JSONDecodeError as e:
+        # Extra text around the array - retry on the outermost [...] only
+        outer = _outer_json_array(result_text)
+        try:
+            questions = _json_loads(outer) if outer else None
+        except json.JSONDecodeError:
+            questions = None
+        
+        if questions is not None:
+            logger.info(f"[OK] Parsed JSON array after trimming surrounding text: {len(questions)} questions")
+        else:
             logger.warning(f"[WARNING]  JSON parse error at line {e.lineno}: {e.msg}")
             logger.warning(f"   Error position: char {e.pos}")
             # Log the problematic section (100 chars around error)
@@ -252,21 +547,21 @@ Return ONLY the JSON array - no markdown, no extra text."""
             fixed_text = result_text
             
             # Fix trailing commas
-            fixed_text = re.sub(r',(\s*[}\]])', r'\1', fixed_text)
+            fixed_text = _TRAILING_COMMA_RE.sub(r'\1', fixed_text)
             
             # Fix unquoted property names
-            fixed_text = re.sub(r'(\{|,)\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:', r'\1"\2":', fixed_text)
+            fixed_text = _UNQUOTED_KEY_RE.sub(r'\1"\2":', fixed_text)
             
             # Fix single quotes to double quotes
             fixed_text = fixed_text.replace("'", '"')
             
             # Remove comments
-            fixed_text = re.sub(r'//.*?\n', '\n', fixed_text)
-            fixed_text = re.sub(r'/\*.*?\*/', '', fixed_text, flags=re.DOTALL)
+            fixed_text = _LINE_COMMENT_RE.sub('\n', fixed_text)
+            fixed_text = _BLOCK_COMMENT_RE.sub('', fixed_text)
             
             # Try parsing fixed JSON
             try:
-                questions = json.loads(fixed_text)
+                questions = _json_loads(fixed_text)
                 logger.info(f"[OK] Fixed and parsed JSON: {len(questions)} questions")
             except json.JSONDecodeError as e2:
                 logger.error(f"[ERROR] Could not fix JSON. Error: {e2}")
@@ -282,111 +577,283 @@ Return ONLY the JSON array - no markdown, no extra text."""
                         open_braces = truncated.count('{') - truncated.count('}')
                         if open_braces > 0:
                             truncated = truncated.rstrip(',') + '}' * open_braces
-                        questions = json.loads(truncated)
+                        questions = _json_loads(truncated)
                         logger.info(f"[OK] Extracted partial JSON: {len(questions)} questions")
                 except:
                     logger.error(f"[ERROR] All JSON repair attempts failed")
                     return []
-        
-        if not questions:
-            return []
-        
-        return questions
-        
-    except Exception as e:
-        logger.error(f"[ERROR] Error converting textbook questions: {e}")
+    
+    if not questions:
         return []
+    
+    return questions
+
+
+@functools.lru_cache(maxsize=1)
+def _get_token_encoding():
+    """tiktoken encoding used to measure prompt context, or None if unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken is optional (and fetches its BPE file on first use)
+        return None
 
 
-def generate_quiz_with_textbook_questions(chapter_id: str, class_num: str, subject: str, chapter_name: str, chapter_order: int) -> Dict:
+def _truncate_to_tokens(text: str, max_tokens: int):
     """
-    NEW APPROACH: Generate quizzes prioritizing textbook "Let us reflect" questions
-    Falls back to AI generation if needed
-    Uses Pinecone (production) or ChromaDB (local) via vector_db_utils
+    Cut text to at most max_tokens tokens
+    Returns (text, tokens_used); falls back to ~4 chars per token without tiktoken
     """
-    from ncert_project.vector_db_utils import get_vector_db_manager
-    from students.models import QuizChapter, QuizQuestion, QuestionVariant
+    encoding = _get_token_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text, len(tokens)
+        return encoding.decode(tokens[:max_tokens]), max_tokens
+    
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text, -(-len(text) // 4)
+    cut = text.rfind(' ', 0, max_chars)
+    return text[:cut if cut > 0 else max_chars], max_tokens
+
+
+def _select_prompt_context(documents: List[str], textbook_questions: List[Dict],
+                           token_budget: int = PROMPT_CONTEXT_TOKENS) -> str:
+    """
+    Pick the chapter passages most relevant to the textbook questions
+    Passages are ranked by bag-of-words cosine similarity to the questions and
+    added until the token budget is used, then emitted in chapter order
+    """
+    passages = [p.strip() for doc in documents for p in doc.split('\n\n') if p.strip()]
+    if not passages:
+        return ''
+    
+    question_words = Counter(_WORD_RE.findall(' '.join(q['text'] for q in textbook_questions).lower()))
+    question_norm = math.sqrt(sum(c * c for c in question_words.values())) or 1.0
+    
+    def relevance(passage: str) -> float:
+        words = Counter(_WORD_RE.findall(passage.lower()))
+        if not words:
+            return 0.0
+        dot = sum(count * question_words[word] for word, count in words.items() if word in question_words)
+        return dot / (question_norm * math.sqrt(sum(c * c for c in words.values())))
+    
+    ranked = sorted(range(len(passages)), key=lambda i: relevance(passages[i]), reverse=True)
+    
+    selected = {}
+    remaining = token_budget
+    for i in ranked:
+        if remaining <= 0:
+            break
+        text, used = _truncate_to_tokens(passages[i], remaining)
+        if text != passages[i] and selected:
+            continue  # Doesn't fit whole - try a shorter passage instead
+        selected[i] = text
+        remaining -= used
+    
+    return '\n\n'.join(selected[i] for i in sorted(selected))
+
+
+def _mcq_generation_config(attempt: int = 0, n_questions: int = 10) -> Dict:
+    """
+    Generation settings for MCQ conversion
+    Low temperature keeps output deterministic (and cache friendly); the token
+    cap scales with the number of MCQs asked for, up to the model's output limit
+    """
+    return {
+        'temperature': 0.3 if attempt == 0 else 0.1,  # Lower temp on retry
+        'top_p': 0.8,
+        'top_k': 40,
+        'max_output_tokens': min(n_questions * MCQ_OUTPUT_TOKENS_PER_QUESTION, MCQ_MAX_OUTPUT_TOKENS),
+    }
+
+
+@functools.lru_cache(maxsize=32)
+def _language_level_for(class_num: str) -> str:
+    """Age-appropriate language instruction for a class ("5", "Class 5", ...)"""
+    class_number = int(''.join(filter(str.isdigit, class_num)))
+    if class_number <= 5:
+        return "very simple language for 10-11 year olds"
+    elif class_number <= 8:
+        return "moderate language for 12-14 year olds"
+    return "advanced language for 15+ year olds"
+
+
+def build_prompt(textbook_questions: List[Dict], documents: List[str], class_num: str,
+                 num_questions: int = 10) -> str:
+    """
+    Build the MCQ conversion prompt for one chapter
+    Shared by the streaming path and the batch pre-generation path
+    """
+    # Age-appropriate settings
+    language_level = _language_level_for(str(class_num))
+    
+    # Prepare questions for AI - the extractor already caps them at 10
+    questions_text = "\n".join(f"{i}. {q['text']}" for i, q in enumerate(textbook_questions, 1))
+    
+    # Most relevant passages within the token budget, not a blind character slice
+    prompt_context = _select_prompt_context(documents, textbook_questions)
+    
+    return f"""You are converting textbook reflection questions into MCQs for Class {class_num} students.
+
+TEXTBOOK QUESTIONS (from "Let us reflect", "Activity", "Discuss", "Do you know" sections):
+{questions_text}
+
+CHAPTER CONTENT (includes OCR-extracted text from diagrams, maps, charts):
+{prompt_context}
+
+TASK: Convert EACH question into a 4-option MCQ with EXACTLY 5 variants.
+
+CRITICAL REQUIREMENTS:
+1. Generate EXACTLY {num_questions} QUESTIONS (if textbook has fewer, create content-based questions to reach {num_questions})
+2. Each question MUST have EXACTLY 5 VARIANTS (different wording, same concept)
+3. Use {language_level}
+4. Keep the original question's intent and difficulty
+5. Create exactly 4 options (A, B, C, D) per question
+6. Extract relevant RAG context from the content
+7. Mix difficulty: label as easy/medium/hard based on original question complexity
+8. EXPLANATIONS: Keep SHORT (2-3 sentences max), simple, plain text - NO markdown (no *, #, **, _)
+9. **IMPORTANT**: Consider image content (diagrams, maps, charts) extracted via OCR - create visual/diagram-based questions too
+
+IMAGE-BASED QUESTION TYPES (if content has diagrams):
+- "Based on the diagram, what is a dune?"
+- "According to the rivers map, which landform is formed by wind?"
+- "Looking at the water cycle chart, where does evaporation occur?"
+
+EXPLANATION RULES:
+[OK] GOOD: "The answer is B because rivers flow from mountains to the sea. Water always moves downward due to gravity."
+[ERROR] BAD: "**Rivers flow from mountains to the sea.** This is because of *gravity* which pulls water downward. Rivers start high up..."
+
+OUTPUT FORMAT (NDJSON) - exactly {num_questions} lines, ONE complete JSON object per line, no surrounding array:
+{{"original_question": "Original textbook question", "topic": "Topic name", "difficulty": "easy|medium|hard", "rag_context": "Relevant content quote", "variants": [{{"question": "MCQ version of the question?", "options": {{"A": "First option", "B": "Second option", "C": "Third option", "D": "Fourth option"}}, "correct": "B", "explanation": "Why B is correct with reference to content"}}, {{"question": "Variant 2 wording?", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct": "C", "explanation": "Explanation for variant 2"}}, {{"question": "Variant 3 wording?", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct": "A", "explanation": "Explanation for variant 3"}}, {{"question": "Variant 4 wording?", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct": "D", "explanation": "Explanation for variant 4"}}, {{"question": "Variant 5 wording?", "options": {{"A": "...", "B": "...", "C": "...", "D": "..."}}, "correct": "B", "explanation": "Explanation for variant 5"}}]}}
+{{"original_question": "Next textbook question", ...same fields...}}
+... (one line per question for all {num_questions} questions - total of {num_questions} questions × 5 variants = {num_questions * 5} total variants)
+
+IMPORTANT: You MUST return exactly {num_questions} questions. If textbook has less than {num_questions} "Let us reflect" questions, create additional questions from the chapter content to reach exactly {num_questions} questions.
+
+[WARNING]  CRITICAL JSON FORMATTING:
+1. Use ONLY double quotes (") - NO single quotes (')
+2. NO trailing commas before closing brackets
+3. Escape special characters in text (use \\" for quotes inside strings)
+4. NO comments (// or /* */)
+5. Ensure all brackets are properly closed
+6. Do NOT put line breaks inside an object - each question is exactly one line
+7. Test each line is valid JSON before returning
+
+Return ONLY the {num_questions} JSON lines - no array brackets, no markdown code fences, no extra text."""
+
+
+def iter_mcqs_from_textbook_questions(textbook_questions: List[Dict], documents: List[str], class_num: str,
+                                      num_questions: int = 10, use_cache: bool = True) -> Iterator[Dict]:
+    """
+    Convert textbook questions into MCQs with AI, streaming the response
+    Each MCQ is yielded as soon as the model finishes writing it; a response
+    cut short (output limit reached) is followed by a request for the rest
+    With use_cache=False the cached answer for the prompt is dropped, not reused
+    """
+    if not textbook_questions:
+        return
     
     try:
-        # Get Vector DB manager (Pinecone in production, ChromaDB local)
-        vector_manager = get_vector_db_manager()
-        db_type = "Pinecone" if hasattr(vector_manager, 'index_name') else "ChromaDB"
-        logger.info(f"[SEARCH] Fetching content from {db_type} for: {chapter_name} (Class {class_num}, {subject})")
-        logger.info(f"   Parameters: class_num={class_num}, subject={subject}, chapter={chapter_name}")
-        
-        # Build specific query for this chapter - CRITICAL: Filter by chapter!
-        query_text = f"{subject} {chapter_name} content summary questions"
-        
-        # IMPORTANT: Pass chapter parameter to filter results to ONLY this chapter
-        results = vector_manager.query_by_class_subject_chapter(
-            query_text=query_text,
-            class_num=str(class_num),
-            subject=subject,
-            chapter=chapter_name,  # ← THIS IS CRITICAL! Filter by specific chapter
-            n_results=50  # Get comprehensive content from THIS CHAPTER ONLY
-        )
-        
-        logger.info(f"   Query returned: {len(results.get('documents', [[]])[0])} chunks")
-        
-        if not results or not results.get("documents") or not results["documents"][0]:
-            logger.error(f"[ERROR] No content in {db_type} for {chapter_id}")
-            logger.error(f"   Tried to find: Class {class_num}, Subject: {subject}, Chapter: {chapter_name}")
-            return {"status": "error", "success": False, "error": f"No content in {db_type}"}
-        
-        # Combine all documents
-        documents = results["documents"][0]
-        metadatas = results.get("metadatas", [[]])[0]
-        
-        # Verify we got the right chapter content
-        if metadatas:
-            logger.info(f"[BOOK] Retrieved from {db_type}: {metadatas[0].get('class')} - {metadatas[0].get('subject')} - {metadatas[0].get('chapter')}")
+        _, gemini_api_key = _get_clients()
+        if not gemini_api_key:
+            logger.error("[ERROR] No AI service available")
+            return
         
-        full_content = "\n\n".join(documents)
+        # Built once and reused by every retry
+        prompt = build_prompt(textbook_questions, documents, class_num, num_questions)
         
-        logger.info(f"[DOC] Retrieved {len(documents)} chunks from {chapter_name}, total {len(full_content)} chars")
+        # Identical prompts (same questions, context and class) reuse the last answer
+        cache_key = 'quiz_llm:' + hashlib.sha256(f"{MCQ_MODEL}\n{prompt}".encode('utf-8')).hexdigest()
+        cached = None
+        if use_cache:
+            cached = cache.get(cache_key)
+        else:
+            cache.delete(cache_key)
+        if cached:
+            logger.info(f"[OK] Using cached MCQs for identical prompt ({len(cached)} questions)")
+            yield from cached
+            return
         
-        # STEP 1: Extract "Let us reflect" questions
-        textbook_questions = extract_let_us_reflect_questions(full_content)
-        logger.info(f"[NOTE] Found {len(textbook_questions)} textbook reflection questions")
+        # Use Gemini with retry logic - streamed so MCQs reach the caller early
+        received = []
+        generated = []
+        yielded = 0
+        max_retries = 3
         
-        # STEP 2: Convert to MCQs
-        mcq_data = []
-        if textbook_questions:
-            mcq_data = generate_mcqs_from_textbook_questions(textbook_questions, full_content, class_num)
+        def stream_text(response):
+            for chunk in response:
+                received.append(chunk.text)
+                yield chunk.text
         
-        # If textbook MCQ generation failed or no textbook questions, use fallback
-        if not mcq_data:
-            logger.warning("[WARNING] No MCQs from textbook questions, generating from content")
-            # Fallback to regular AI generation
+        for attempt in range(max_retries):
+            received.clear()
             try:
-                from students.quiz_generator import generate_mcq_questions_with_ai
-                mcq_data = generate_mcq_questions_with_ai(full_content, chapter_name, class_num)
-            except Exception as fallback_err:
-                logger.error(f"[ERROR] Fallback generation failed: {fallback_err}")
+                model = genai.GenerativeModel(MCQ_MODEL)
+                response = model.generate_content(
+                    prompt,
+                    generation_config=_mcq_generation_config(attempt, num_questions),
+                    stream=True
+                )
+                for question in _iter_ndjson_items(stream_text(response)):
+                    question = _validate_mcq(question)
+                    if question is None:
+                        continue
+                    generated.append(question)
+                    yielded += 1
+                    yield question
+                logger.info(f"[OK] Gemini converted textbook questions to MCQs (attempt {attempt + 1})")
+                break  # Success, exit retry loop
+            except Exception as e:
+                if yielded:
+                    # Questions already handed to the caller can't be retried
+                    logger.warning(f"[WARNING]  Gemini stream interrupted after {yielded} MCQs: {e}")
+                    return
+                logger.warning(f"[WARNING]  Gemini attempt {attempt + 1} failed: {e}")
+                if attempt == max_retries - 1:
+                    logger.error(f"[ERROR] All Gemini attempts failed")
+                    return
+                time.sleep(1)  # Brief pause before retry
         
-        if not mcq_data:
-            logger.error("[ERROR] Failed to generate MCQs from all methods")
-            return {"success": False, "error": "Failed to generate questions after all attempts"}
+        if yielded:
+            logger.info(f"[OK] Streamed {yielded} MCQs from textbook questions")
+            if yielded < num_questions:
+                # Truncated response - ask for the missing MCQs from the questions
+                # the model hadn't reached yet (each round makes progress, so this ends)
+                missing = num_questions - yielded
+                logger.warning(f"[WARNING]  Response stopped after {yielded}/{num_questions} MCQs - requesting {missing} more")
+                rest = textbook_questions[yielded:] or textbook_questions
+                for question in iter_mcqs_from_textbook_questions(rest, documents, class_num, missing, use_cache):
+                    generated.append(question)
+                    yield question
+            cache.set(cache_key, generated, LLM_RESPONSE_CACHE_TTL)
+            return
         
-        # CRITICAL: Ensure EXACTLY 10 questions
-        if len(mcq_data) < 10:
-            logger.warning(f"[WARNING] Only {len(mcq_data)} questions generated, need exactly 10")
-            # Generate additional questions to reach 10
-            from students.quiz_generator import generate_mcq_questions_with_ai
-            additional_needed = 10 - len(mcq_data)
-            logger.info(f"🔄 Generating {additional_needed} additional questions from content...")
-            additional_mcqs = generate_mcq_questions_with_ai(full_content, chapter_name, class_num, num_questions=additional_needed)
-            if additional_mcqs:
-                mcq_data.extend(additional_mcqs[:additional_needed])
-        
-        # Ensure exactly 10 questions (trim if more, keep all if less)
-        if len(mcq_data) > 10:
-            mcq_data = mcq_data[:10]
-            logger.info(f"✂️ Trimmed to exactly 10 questions")
-        
-        logger.info(f"[STATS] Final question count: {len(mcq_data)} questions")
-        
-        # STEP 3: Create/update database records
+        # Nothing parsed incrementally - repair the full response instead
+        if received:
+            generated = _validated_mcqs(_parse_mcq_json(''.join(received)))
+            if generated:
+                cache.set(cache_key, generated, LLM_RESPONSE_CACHE_TTL)
+            yield from generated
+        
+    except Exception as e:
+        logger.error(f"[ERROR] Error converting textbook questions: {e}")
+
+
+def generate_mcqs_from_textbook_questions(textbook_questions: List[Dict], content: str, class_num: str) -> List[Dict]:
+    """
+    Convert textbook questions into MCQs with AI
+    """
+    return list(iter_mcqs_from_textbook_questions(textbook_questions, [content], class_num))
+
+
+def _prepare_quiz_chapter(chapter_id: str, class_num: str, subject: str, chapter_name: str, chapter_order: int):
+    """
+    Get or create the QuizChapter and clear any previously generated questions
+    """
+    with transaction.atomic():
         quiz_chapter, created = QuizChapter.objects.get_or_create(
             chapter_id=chapter_id,
             defaults={
@@ -402,48 +869,674 @@ def generate_quiz_with_textbook_questions(chapter_id: str, class_num: str, subje
         )
         
         if not created:
-            # Delete old questions
-            QuizQuestion.objects.filter(chapter=quiz_chapter).delete()
+            # Delete old questions. No delete signals are registered on these
+            # models, so the CASCADE is applied by hand with one raw DELETE per
+            # table instead of Django's collector loading every related row
+            QuizAnswer.objects.filter(question__chapter=quiz_chapter)._raw_delete(using='default')
+            QuestionVariant.objects.filter(question__chapter=quiz_chapter)._raw_delete(using='default')
+            QuizQuestion.objects.filter(chapter=quiz_chapter)._raw_delete(using='default')
             quiz_chapter.total_questions = 10  # Always 10 questions
             quiz_chapter.save()
-        
-        # Create questions and variants
-        for q_num, q_data in enumerate(mcq_data, 1):
-            quiz_question = QuizQuestion.objects.create(
+    
+    return quiz_chapter
+
+
+def _save_quiz_questions(quiz_chapter, first_number: int, mcq_list: List[Dict]):
+    """
+    Bulk insert QuizQuestions and all of their variants in one transaction
+    """
+    with transaction.atomic():
+        questions = QuizQuestion.objects.bulk_create([
+            QuizQuestion(
                 chapter=quiz_chapter,
                 question_number=q_num,
                 topic=q_data.get('topic', 'General'),
                 difficulty=q_data.get('difficulty', 'medium'),
                 rag_context=q_data.get('rag_context', '')
             )
-            
-            # Create 3 variants
-            for v_num, variant_data in enumerate(q_data['variants'], 1):
-                QuestionVariant.objects.create(
-                    question=quiz_question,
-                    variant_number=v_num,
-                    question_text=variant_data['question'],
-                    option_a=variant_data['options']['A'],
-                    option_b=variant_data['options']['B'],
-                    option_c=variant_data['options']['C'],
-                    option_d=variant_data['options']['D'],
-                    correct_answer=variant_data['correct'],
-                    explanation=variant_data['explanation']
-                )
+            for q_num, q_data in enumerate(mcq_list, first_number)
+        ])
         
-        logger.info(f"[OK] Created quiz: {len(mcq_data)} questions × 3 variants = {len(mcq_data)*3} total variants")
+        # Backends that can't return PKs from bulk_create (old SQLite/MySQL)
+        # leave them unset - look them up by question number instead
+        if any(question.pk is None for question in questions):
+            pks = dict(QuizQuestion.objects.filter(
+                chapter=quiz_chapter,
+                question_number__in=[question.question_number for question in questions]
+            ).values_list('question_number', 'pk'))
+            for question in questions:
+                question.pk = pks[question.question_number]
         
-        return {
-            "status": "success",
-            "success": True,
-            "chapter_id": chapter_id,
-            "total_questions": len(mcq_data),
-            "questions_generated": len(mcq_data),
-            "textbook_questions_used": len(textbook_questions)
-        }
+        QuestionVariant.objects.bulk_create([
+            QuestionVariant(
+                question=quiz_question,
+                variant_number=v_num,
+                question_text=variant_data['question'],
+                option_a=variant_data['options']['A'],
+                option_b=variant_data['options']['B'],
+                option_c=variant_data['options']['C'],
+                option_d=variant_data['options']['D'],
+                correct_answer=variant_data['correct'],
+                explanation=variant_data['explanation']
+            )
+            for quiz_question, q_data in zip(questions, mcq_list)
+            for v_num, variant_data in enumerate(q_data['variants'], 1)
+        ], batch_size=500)
+
+
+def _chapter_documents_cache_key(class_num: str, subject: str, chapter_name: str) -> str:
+    """Django cache key for a chapter's vector DB chunks"""
+    raw_key = f"{class_num}|{subject}|{chapter_name}"
+    return f"quiz_chapter_docs_{hashlib.md5(raw_key.encode('utf-8')).hexdigest()}"
+
+
+def invalidate_chapter_documents(class_num: str, subject: str, chapter_name: str):
+    """
+    Drop the cached vector DB chunks for a chapter (call after re-uploading it)
+    """
+    cache.delete(_chapter_documents_cache_key(str(class_num), subject, chapter_name))
+
+
+def _cached_mcqs_for(mcq_cache, documents: List[str], chapter_id: str, use_cache: bool = True) -> Optional[List[Dict]]:
+    """
+    MCQs cached for this chapter content, or None
+    With use_cache=False the chapter's cached MCQs are evicted instead, so a
+    forced regeneration can't be answered from them
+    """
+    if mcq_cache is None:
+        return None
+    if not use_cache:
+        mcq_cache.evict_cached_mcqs(chapter_id)
+        return None
+    return mcq_cache.get_cached_mcqs(documents, chapter_id, MCQ_CACHE_VERSION)
+
+
+def _fetch_chapter_documents(vector_manager, class_num: str, subject: str, chapter_name: str) -> Optional[List[str]]:
+    """
+    Fetch all vector DB chunks for one chapter
+    Returns None when the chapter has no content
+    The same chapter always issues the same query, so the chunk list is cached
+    """
+    cache_key = _chapter_documents_cache_key(str(class_num), subject, chapter_name)
+    documents = cache.get(cache_key)
+    if documents:
+        logger.info(f"[OK] Using cached chunks for: {chapter_name} (Class {class_num}, {subject})")
+        return documents
+    
+    logger.info(f"[SEARCH] Fetching content from {VECTOR_DB_NAME} for: {chapter_name} (Class {class_num}, {subject})")
+    logger.info(f"   Parameters: class_num={class_num}, subject={subject}, chapter={chapter_name}")
+    
+    # Build specific query for this chapter - CRITICAL: Filter by chapter!
+    query_text = f"{subject} {chapter_name} content summary questions"
+    
+    # IMPORTANT: Pass chapter parameter to filter results to ONLY this chapter
+    results = vector_manager.query_by_class_subject_chapter(
+        query_text=query_text,
+        class_num=str(class_num),
+        subject=subject,
+        chapter=chapter_name,  # ← THIS IS CRITICAL! Filter by specific chapter
+        n_results=50  # Get comprehensive content from THIS CHAPTER ONLY
+    )
+    
+    logger.info(f"   Query returned: {len(results.get('documents', [[]])[0])} chunks")
+    
+    if not results or not results.get("documents") or not results["documents"][0]:
+        logger.error(f"[ERROR] No content in {VECTOR_DB_NAME} for {chapter_name}")
+        logger.error(f"   Tried to find: Class {class_num}, Subject: {subject}, Chapter: {chapter_name}")
+        return None
+    
+    documents = results["documents"][0]
+    metadatas = results.get("metadatas", [[]])[0]
+    
+    # Verify we got the right chapter content
+    if metadatas:
+        logger.info(f"[BOOK] Retrieved from {VECTOR_DB_NAME}: {metadatas[0].get('class')} - {metadatas[0].get('subject')} - {metadatas[0].get('chapter')}")
+    
+    logger.info(f"[DOC] Retrieved {len(documents)} chunks from {chapter_name}, total {sum(map(len, documents))} chars")
+    
+    cache.set(cache_key, documents, CHAPTER_DOCUMENTS_CACHE_TTL)
+    return documents
+
+
+def _leading_content(documents: List[str], max_chars: int = FALLBACK_CONTENT_CHARS) -> str:
+    """
+    Join only as many leading chunks as the fallback prompt can use,
+    instead of the whole chapter - the last chunk is cut to fit
+    """
+    parts = []
+    remaining = max_chars
+    for doc in documents:
+        if remaining <= 0:
+            break
+        parts.append(doc[:remaining])
+        remaining -= len(parts[-1]) + 2  # + the "\n\n" separator
+    return "\n\n".join(parts)
+
+
+def _complete_quiz(chapter_id: str, class_num: str, subject: str, chapter_name: str, chapter_order: int,
+                   documents: List[str], textbook_questions: List[Dict], mcq_data: List[Dict],
+                   mcq_cache=None, from_cache: bool = False) -> Dict:
+    """
+    Top up to exactly 10 questions, replace the chapter's quiz and cache the result
+    The old questions are deleted and the new ones inserted in one transaction
+    """
+    mcq_data = _validated_mcqs(mcq_data or [])
+    fallback_content = None  # Joined only if a fallback generation needs it
+    
+    # If textbook MCQ generation failed or no textbook questions, use fallback
+    if not mcq_data:
+        logger.warning("[WARNING] No MCQs from textbook questions, generating from content")
+        # Fallback to regular AI generation
+        try:
+            fallback_content = _leading_content(documents)
+            mcq_data = _validated_mcqs(generate_mcq_questions_with_ai(fallback_content, chapter_name, class_num) or [])
+        except Exception as fallback_err:
+            logger.error(f"[ERROR] Fallback generation failed: {fallback_err}")
+        
+        if not mcq_data:
+            logger.error("[ERROR] Failed to generate MCQs from all methods")
+            return {"success": False, "error": "Failed to generate questions after all attempts"}
+    
+    # CRITICAL: Ensure EXACTLY 10 questions
+    total_generated = len(mcq_data)
+    if total_generated < 10:
+        logger.warning(f"[WARNING] Only {total_generated} questions generated, need exactly 10")
+        # Generate additional questions to reach 10
+        additional_needed = 10 - total_generated
+        logger.info(f"🔄 Generating {additional_needed} additional questions from content...")
+        if fallback_content is None:
+            fallback_content = _leading_content(documents)
+        additional_mcqs = generate_mcq_questions_with_ai(fallback_content, chapter_name, class_num, num_questions=additional_needed)
+        if additional_mcqs:
+            mcq_data.extend(_validated_mcqs(additional_mcqs)[:additional_needed])
+    
+    # Ensure exactly 10 questions (trim if more, keep all if less)
+    if len(mcq_data) > 10:
+        mcq_data = mcq_data[:10]
+        logger.info(f"✂️ Trimmed to exactly 10 questions")
+    
+    logger.info(f"[STATS] Final question count: {len(mcq_data)} questions")
+    
+    # STEP 3: Delete the old questions and insert the new ones in one commit,
+    # so readers see either the old quiz or the complete new one
+    with transaction.atomic():
+        quiz_chapter = _prepare_quiz_chapter(chapter_id, class_num, subject, chapter_name, chapter_order)
+        _save_quiz_questions(quiz_chapter, 1, mcq_data)
+    
+    # Only complete quizzes are cached
+    if mcq_cache and not from_cache and len(mcq_data) == 10:
+        mcq_cache.cache_mcqs(documents, chapter_id, mcq_data, MCQ_CACHE_VERSION)
+    
+    saved_count = len(mcq_data)
+    logger.info(f"[OK] Created quiz: {saved_count} questions × 3 variants = {saved_count*3} total variants")
+    
+    return {
+        "status": "success",
+        "success": True,
+        "chapter_id": chapter_id,
+        "total_questions": saved_count,
+        "questions_generated": saved_count,
+        "textbook_questions_used": len(textbook_questions)
+    }
+
+
+def generate_quiz_with_textbook_questions(chapter_id: str, class_num: str, subject: str, chapter_name: str, chapter_order: int,
+                                          use_cache: bool = True) -> Dict:
+    """
+    NEW APPROACH: Generate quizzes prioritizing textbook "Let us reflect" questions
+    Falls back to AI generation if needed
+    Uses Pinecone (production) or ChromaDB (local) via vector_db_utils
+    use_cache=False evicts and skips the MCQ and prompt caches for this chapter
+    """
+    try:
+        # Get Vector DB manager (Pinecone in production, ChromaDB local)
+        vector_manager = get_vector_db_manager()
+        documents = _fetch_chapter_documents(vector_manager, class_num, subject, chapter_name)
+        if documents is None:
+            return {"status": "error", "success": False, "error": f"No content in {VECTOR_DB_NAME}"}
+        
+        # STEP 1: Extract "Let us reflect" questions
+        textbook_questions = extract_questions_from_documents(documents)
+        logger.info(f"[NOTE] Found {len(textbook_questions)} textbook reflection questions")
+        
+        # Reuse MCQs already generated for this exact chapter content (ChromaDB only)
+        mcq_cache = vector_manager if hasattr(vector_manager, 'get_cached_mcqs') else None
+        cached_mcqs = _cached_mcqs_for(mcq_cache, documents, chapter_id, use_cache)
+        
+        # STEP 2: Convert to MCQs - the response is still parsed and validated
+        # line by line as it streams, but nothing is written until the whole
+        # quiz is ready, so the old quiz keeps being served until it is replaced
+        mcq_data = []
+        if cached_mcqs:
+            logger.info(f"[OK] Using {len(cached_mcqs)} cached MCQs, skipping AI generation")
+            mcq_data = cached_mcqs
+        elif textbook_questions:
+            # Questions that already are MCQs (with an answer key) skip the LLM
+            native_mcqs, needs_llm = _split_native_mcqs(textbook_questions)
+            mcq_data = native_mcqs[:10]
+            
+            remaining = 10 - len(mcq_data)
+            if needs_llm and remaining:
+                # Drained fully so the generator gets to cache the prompt result
+                llm_mcqs = list(iter_mcqs_from_textbook_questions(needs_llm, documents, class_num, remaining, use_cache))
+                mcq_data.extend(llm_mcqs[:remaining])
+        
+        return _complete_quiz(
+            chapter_id, class_num, subject, chapter_name, chapter_order,
+            documents, textbook_questions, mcq_data,
+            mcq_cache=mcq_cache, from_cache=bool(cached_mcqs)
+        )
         
     except Exception as e:
-        logger.error(f"[ERROR] Quiz generation failed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"[ERROR] Quiz generation failed: {e}")
         return {"status": "error", "success": False, "error": str(e), "message": str(e)}
+
+
+def _run_gemini_batch(prompts: Dict[str, str], poll_interval: int = 30) -> Dict[str, str]:
+    """
+    Submit prompts as one Gemini Batch API job and wait for it to finish
+    Requires the google-genai SDK; returns {key: response_text} for every
+    request that succeeded (empty dict if the job could not run)
+    """
+    try:
+        from google import genai as genai_batch
+    except ImportError:
+        logger.warning("[WARNING]  google-genai is not installed - Gemini Batch API unavailable")
+        return {}
+    
+    client = genai_batch.Client(api_key=_get_clients()[1])
+    
+    # One JSONL request per chapter, keyed so results can be matched back
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+        for key, prompt in prompts.items():
+            f.write(json.dumps({
+                'key': key,
+                'request': {
+                    'contents': [{'role': 'user', 'parts': [{'text': prompt}]}],
+                    'generation_config': _mcq_generation_config(),
+                },
+            }) + '\n')
+        requests_path = f.name
+    
+    try:
+        uploaded = client.files.upload(
+            file=requests_path,
+            config={'display_name': 'quiz-batch-requests', 'mime_type': 'jsonl'}
+        )
+        job = client.batches.create(
+            model=MCQ_MODEL,
+            src=uploaded.name,
+            config={'display_name': 'quiz-batch'}
+        )
+        logger.info(f"[OK] Submitted Gemini batch job {job.name} with {len(prompts)} chapters")
+        
+        finished_states = {'JOB_STATE_SUCCEEDED', 'JOB_STATE_FAILED', 'JOB_STATE_CANCELLED', 'JOB_STATE_EXPIRED'}
+        while job.state.name not in finished_states:
+            time.sleep(poll_interval)
+            job = client.batches.get(name=job.name)
+        
+        if job.state.name != 'JOB_STATE_SUCCEEDED':
+            logger.error(f"[ERROR] Gemini batch job {job.name} ended with {job.state.name}")
+            return {}
+        
+        results = {}
+        output = client.files.download(file=job.dest.file_name).decode('utf-8')
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            try:
+                parts = entry['response']['candidates'][0]['content']['parts']
+                results[entry['key']] = ''.join(part.get('text', '') for part in parts)
+            except (KeyError, IndexError):
+                logger.warning(f"[WARNING]  No batch output for {entry.get('key')}: {entry.get('error')}")
+        
+        logger.info(f"[OK] Gemini batch job returned {len(results)}/{len(prompts)} results")
+        return results
+    except Exception as e:
+        logger.error(f"[ERROR] Gemini batch job failed: {e}")
+        return {}
+    finally:
+        os.remove(requests_path)
+
+
+def _run_openai_batch(prompts: Dict[str, str], poll_interval: int = 30) -> Dict[str, str]:
+    """
+    Submit prompts as one OpenAI Batch API job (/v1/chat/completions) and wait
+    Returns {custom_id: response_text} for every request that succeeded
+    (empty dict if the job could not run)
+    """
+    openai_api_key, _ = _get_clients()
+    client = openai.OpenAI(api_key=openai_api_key)
+    if not hasattr(client, 'batches'):
+        logger.warning("[WARNING]  Installed openai SDK has no Batch API - upgrade openai to use it")
+        return {}
+    
+    config = _mcq_generation_config()
+    with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False, encoding='utf-8') as f:
+        for key, prompt in prompts.items():
+            f.write(json.dumps({
+                'custom_id': key,
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'model': OPENAI_BATCH_MODEL,
+                    'messages': [{'role': 'user', 'content': prompt}],
+                    'temperature': config['temperature'],
+                    'top_p': config['top_p'],
+                    'max_tokens': config['max_output_tokens'],
+                },
+            }) + '\n')
+        requests_path = f.name
+    
+    try:
+        with open(requests_path, 'rb') as requests_file:
+            uploaded = client.files.create(file=requests_file, purpose='batch')
+        job = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint='/v1/chat/completions',
+            completion_window='24h'
+        )
+        logger.info(f"[OK] Submitted OpenAI batch job {job.id} with {len(prompts)} chapters")
+        
+        finished_states = {'completed', 'failed', 'expired', 'cancelled'}
+        while job.status not in finished_states:
+            time.sleep(poll_interval)
+            job = client.batches.retrieve(job.id)
+        
+        if job.status != 'completed' or not job.output_file_id:
+            logger.error(f"[ERROR] OpenAI batch job {job.id} ended with {job.status}")
+            return {}
+        
+        results = {}
+        output = client.files.content(job.output_file_id).text
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            try:
+                response = entry['response']
+                if response['status_code'] != 200:
+                    raise KeyError('status_code')
+                results[entry['custom_id']] = response['body']['choices'][0]['message']['content']
+            except (KeyError, IndexError, TypeError):
+                logger.warning(f"[WARNING]  No batch output for {entry.get('custom_id')}: {entry.get('error')}")
+        
+        logger.info(f"[OK] OpenAI batch job returned {len(results)}/{len(prompts)} results")
+        return results
+    except Exception as e:
+        logger.error(f"[ERROR] OpenAI batch job failed: {e}")
+        return {}
+    finally:
+        os.remove(requests_path)
+
+
+def _run_batch(prompts: Dict[str, str], poll_interval: int = 30) -> Dict[str, str]:
+    """
+    Run prompts through a provider Batch API - Gemini when the google-genai
+    SDK and a key are available, otherwise OpenAI
+    """
+    openai_api_key, gemini_api_key = _get_clients()
+    if gemini_api_key:
+        try:
+            from google import genai as genai_batch  # noqa: F401
+            return _run_gemini_batch(prompts, poll_interval=poll_interval)
+        except ImportError:
+            pass
+    if openai_api_key:
+        return _run_openai_batch(prompts, poll_interval=poll_interval)
+    logger.warning("[WARNING]  No Batch API available - chapters will be generated one by one")
+    return {}
+
+
+def generate_quizzes_batch(chapters: List[Dict], poll_interval: int = 30, use_cache: bool = True) -> List[Dict]:
+    """
+    Generate quizzes for many chapters with a single Batch API job (Gemini or OpenAI)
+    Intended for offline pre-generation of a whole class/subject; ad-hoc
+    regenerations should keep using generate_quiz_with_textbook_questions.
+    
+    Each chapter dict needs: chapter_id, class_num, subject, chapter_name, chapter_order
+    Chapters without textbook questions, or whose batch request failed, are
+    generated through the synchronous path instead.
+    """
+    vector_manager = get_vector_db_manager()
+    mcq_cache = vector_manager if hasattr(vector_manager, 'get_cached_mcqs') else None
+    
+    results = []
+    pending = {}  # chapter_id -> (chapter, documents, textbook_questions, native_mcqs)
+    prompts = {}
+    
+    for chapter in chapters:
+        # One bad chapter (vector DB error, unparseable class...) must not
+        # abort the whole batch
+        try:
+            documents = _fetch_chapter_documents(
+                vector_manager, chapter['class_num'], chapter['subject'], chapter['chapter_name']
+            )
+            if documents is None:
+                results.append({"status": "error", "success": False, "chapter_id": chapter['chapter_id'],
+                                "error": "No content in vector DB"})
+                continue
+            
+            textbook_questions = extract_questions_from_documents(documents)
+            cached_mcqs = _cached_mcqs_for(mcq_cache, documents, chapter['chapter_id'], use_cache)
+            if cached_mcqs:
+                results.append(_complete_quiz(
+                    chapter['chapter_id'], chapter['class_num'], chapter['subject'], chapter['chapter_name'],
+                    chapter['chapter_order'], documents, textbook_questions, cached_mcqs,
+                    from_cache=True
+                ))
+                continue
+            
+            if not textbook_questions:
+                # Nothing to convert - the synchronous path handles the fallback
+                results.append(generate_quiz_with_textbook_questions(**chapter, use_cache=use_cache))
+                continue
+            
+            native_mcqs, needs_llm = _split_native_mcqs(textbook_questions)
+            if not needs_llm:
+                results.append(_complete_quiz(
+                    chapter['chapter_id'], chapter['class_num'], chapter['subject'], chapter['chapter_name'],
+                    chapter['chapter_order'], documents, textbook_questions, native_mcqs,
+                    mcq_cache=mcq_cache
+                ))
+                continue
+            
+            prompt = build_prompt(needs_llm, documents, chapter['class_num'], 10 - len(native_mcqs))
+            pending[chapter['chapter_id']] = (chapter, documents, textbook_questions, native_mcqs)
+            prompts[chapter['chapter_id']] = prompt
+        except Exception as e:
+            logger.error(f"[ERROR] Batch quiz preparation failed for {chapter['chapter_id']}: {e}")
+            results.append({"status": "error", "success": False, "chapter_id": chapter['chapter_id'], "error": str(e)})
+    
+    batch_output = _run_batch(prompts, poll_interval=poll_interval) if prompts else {}
+    
+    for chapter_id, (chapter, documents, textbook_questions, native_mcqs) in pending.items():
+        if chapter_id not in batch_output:
+            results.append(generate_quiz_with_textbook_questions(**chapter, use_cache=use_cache))
+            continue
+        
+        try:
+            mcq_data = native_mcqs + _validated_mcqs(_parse_mcq_json(batch_output[chapter_id]))
+            results.append(_complete_quiz(
+                chapter_id, chapter['class_num'], chapter['subject'], chapter['chapter_name'],
+                chapter['chapter_order'], documents, textbook_questions, mcq_data,
+                mcq_cache=mcq_cache
+            ))
+        except Exception as e:
+            logger.error(f"[ERROR] Batch quiz generation failed for {chapter_id}: {e}")
+            results.append({"status": "error", "success": False, "chapter_id": chapter_id, "error": str(e)})
+    
+    return results
+
+
+async def _agenerate_mcqs(prompt: str, num_questions: int = 10, max_retries: int = 3) -> List[Dict]:
+    """
+    Run one MCQ conversion prompt on Gemini without blocking the event loop
+    The response is streamed and each MCQ line is validated as it arrives, so
+    an interrupted stream still keeps the MCQs completed before the failure
+    """
+    _, gemini_api_key = _get_clients()
+    if not gemini_api_key:
+        logger.error("[ERROR] No AI service available")
+        return []
+    
+    model = genai.GenerativeModel(MCQ_MODEL)
+    received = []
+    mcqs = []
+    
+    async def stream_text(response):
+        async for chunk in response:
+            received.append(chunk.text)
+            yield chunk.text
+    
+    for attempt in range(max_retries):
+        received.clear()
+        try:
+            response = await model.generate_content_async(
+                prompt,
+                generation_config=_mcq_generation_config(attempt, num_questions),
+                stream=True
+            )
+            async for question in _aiter_ndjson_items(stream_text(response)):
+                question = _validate_mcq(question)
+                if question is not None:
+                    mcqs.append(question)
+            break  # Success, exit retry loop
+        except Exception as e:
+            if mcqs:
+                logger.warning(f"[WARNING]  Gemini stream interrupted after {len(mcqs)} MCQs: {e}")
+                return mcqs
+            logger.warning(f"[WARNING]  Gemini attempt {attempt + 1} failed: {e}")
+            if attempt < max_retries - 1:
+                await asyncio.sleep(1)  # Brief pause before retry
+    else:
+        logger.error(f"[ERROR] All Gemini attempts failed")
+        return []
+    
+    # Nothing parsed incrementally - repair the full response instead
+    if not mcqs and received:
+        mcqs = _validated_mcqs(_parse_mcq_json(''.join(received)))
+    return mcqs
+
+
+async def _aconvert_textbook_questions(textbook_questions: List[Dict], documents: List[str], class_num: str,
+                                       num_questions: int) -> List[Dict]:
+    """
+    Async MCQ conversion that re-requests the MCQs a truncated response left out
+    """
+    mcqs = []
+    while len(mcqs) < num_questions:
+        missing = num_questions - len(mcqs)
+        if mcqs:
+            logger.warning(f"[WARNING]  Response stopped after {len(mcqs)}/{num_questions} MCQs - requesting {missing} more")
+        rest = textbook_questions[len(mcqs):] or textbook_questions
+        batch = await _agenerate_mcqs(build_prompt(rest, documents, class_num, missing), missing)
+        if not batch:
+            break
+        mcqs.extend(batch[:missing])
+    return mcqs
+
+
+async def agenerate_quiz(chapter_id: str, class_num: str, subject: str, chapter_name: str, chapter_order: int,
+                         use_cache: bool = True) -> Dict:
+    """
+    Async variant of generate_quiz_with_textbook_questions for bulk runs
+    The LLM call is awaited; vector DB and ORM work runs in worker threads
+    """
+    try:
+        vector_manager = get_vector_db_manager()
+        documents = await sync_to_async(_fetch_chapter_documents, thread_sensitive=False)(
+            vector_manager, class_num, subject, chapter_name
+        )
+        if documents is None:
+            return {"status": "error", "success": False, "chapter_id": chapter_id, "error": "No content in vector DB"}
+        
+        textbook_questions = extract_questions_from_documents(documents)
+        
+        mcq_cache = vector_manager if hasattr(vector_manager, 'get_cached_mcqs') else None
+        cached_mcqs = await sync_to_async(_cached_mcqs_for, thread_sensitive=False)(
+            mcq_cache, documents, chapter_id, use_cache
+        )
+        
+        mcq_data = cached_mcqs or []
+        if not mcq_data and textbook_questions:
+            # Questions that already are MCQs (with an answer key) skip the LLM
+            mcq_data, needs_llm = _split_native_mcqs(textbook_questions)
+            if needs_llm and len(mcq_data) < 10:
+                remaining = 10 - len(mcq_data)
+                mcq_data = mcq_data + await _aconvert_textbook_questions(
+                    needs_llm, documents, class_num, remaining
+                )
+        
+        # Fallback, top-up and DB writes stay synchronous; thread_sensitive keeps
+        # the writes on one thread so concurrent chapters don't contend for SQLite
+        return await sync_to_async(_complete_quiz)(
+            chapter_id, class_num, subject, chapter_name, chapter_order,
+            documents, textbook_questions, mcq_data,
+            mcq_cache=mcq_cache, from_cache=bool(cached_mcqs)
+        )
+        
+    except Exception as e:
+        logger.error(f"[ERROR] Quiz generation failed for {chapter_id}: {e}")
+        return {"status": "error", "success": False, "chapter_id": chapter_id, "error": str(e)}
+
+
+def completed_chapter_ids(checkpoint_path: Optional[str]) -> set:
+    """
+    Chapter IDs recorded as successfully generated in a JSONL checkpoint file
+    A missing file means nothing has completed yet
+    """
+    done = set()
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Partially written last line of an interrupted run
+            if entry.get('success') and entry.get('chapter_id'):
+                done.add(entry['chapter_id'])
+    return done
+
+
+def record_checkpoint(checkpoint_path: Optional[str], result: Dict):
+    """
+    Append one chapter result to a JSONL checkpoint file
+    """
+    if not checkpoint_path:
+        return
+    entry = {
+        'chapter_id': result.get('chapter_id'),
+        'success': bool(result.get('success')),
+        'total_questions': result.get('total_questions', 0),
+        'error': result.get('error'),
+    }
+    with open(checkpoint_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
+
+
+async def agenerate_quiz_bulk(chapters: List[Dict], concurrency: int = 8,
+                              checkpoint_path: Optional[str] = None, use_cache: bool = True) -> List[Dict]:
+    """
+    Generate quizzes for many chapters concurrently, at most `concurrency` at a time
+    Each chapter dict needs: chapter_id, class_num, subject, chapter_name, chapter_order
+    With a checkpoint file, chapters already completed there are skipped and
+    every finished chapter is appended, so an interrupted run can resume
+    """
+    done = completed_chapter_ids(checkpoint_path)
+    if done:
+        logger.info(f"[OK] Skipping {len(done)} chapters already completed in {checkpoint_path}")
+        chapters = [chapter for chapter in chapters if chapter['chapter_id'] not in done]
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def bounded(chapter: Dict) -> Dict:
+        async with semaphore:
+            result = await agenerate_quiz(**chapter, use_cache=use_cache)
+        result.setdefault('chapter_id', chapter['chapter_id'])
+        record_checkpoint(checkpoint_path, result)
+        return result
+    
+    return await asyncio.gather(*(bounded(chapter) for chapter in chapters))
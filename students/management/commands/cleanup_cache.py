@@ -2,14 +2,15 @@
 Django management command to clean up expired chat cache entries
 Run this daily via cron or task scheduler:
     python manage.py cleanup_cache
+Celery beat runs the same sweep every 10 minutes (purge_expired_chatcache)
 """
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from students.models import ChatCache
+from students.tasks import purge_expired_chatcache
 
 
 class Command(BaseCommand):
-    help = 'Delete ChatCache entries older than 10 days'
+    help = 'Delete expired, invalidated and low-quality ChatCache entries'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -21,24 +22,25 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         
-        # Find expired entries
-        now = timezone.now()
-        expired_entries = ChatCache.objects.filter(expires_at__lt=now)
-        count = expired_entries.count()
-        
-        if count == 0:
-            self.stdout.write(self.style.SUCCESS('✅ No expired cache entries found'))
-            return
+        # Same set get_active_cache refuses to serve
+        stale_entries = ChatCache.stale_entries()
         
         if dry_run:
+            count = stale_entries.count()
+            if count == 0:
+                self.stdout.write(self.style.SUCCESS('✅ No expired cache entries found'))
+                return
             self.stdout.write(self.style.WARNING(f'🔍 DRY RUN: Would delete {count} expired cache entries'))
-            for entry in expired_entries[:10]:  # Show first 10
+            for entry in stale_entries.only('question', 'expires_at')[:10]:  # Show first 10
                 self.stdout.write(f"  - {entry.question[:50]}... (expired {entry.expires_at})")
             if count > 10:
                 self.stdout.write(f"  ... and {count - 10} more")
         else:
-            # Delete expired entries
-            deleted_count, _ = expired_entries.delete()
+            # Batched _raw_delete, shared with the scheduled sweep
+            deleted_count = purge_expired_chatcache()
+            if deleted_count == 0:
+                self.stdout.write(self.style.SUCCESS('✅ No expired cache entries found'))
+                return
             self.stdout.write(
                 self.style.SUCCESS(f'🗑️  Deleted {deleted_count} expired cache entries')
             )
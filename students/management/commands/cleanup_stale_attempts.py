@@ -0,0 +1,45 @@
+"""
+Django management command to delete abandoned quiz attempts
+Attempts still 'in_progress' after N days are removed with their answers:
+    python manage.py cleanup_stale_attempts --days 7
+Also scheduled daily through Celery beat (purge_stale_quiz_attempts)
+"""
+from django.core.management.base import BaseCommand
+from students.tasks import (
+    PURGE_BATCH_SIZE, STALE_ATTEMPT_DAYS, purge_stale_quiz_attempts, stale_quiz_attempts,
+)
+
+
+class Command(BaseCommand):
+    help = 'Delete quiz attempts left in progress for more than N days'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=STALE_ATTEMPT_DAYS,
+            help=f'Age in days after which an unfinished attempt is stale (default: {STALE_ATTEMPT_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=PURGE_BATCH_SIZE,
+            help=f'Attempts deleted per batch (default: {PURGE_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show how many attempts would be deleted without deleting',
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = stale_quiz_attempts(options['days']).count()
+            self.stdout.write(self.style.WARNING(f'🔍 DRY RUN: Would delete {count} stale quiz attempts'))
+            return
+        
+        deleted_count = purge_stale_quiz_attempts(options['days'], options['batch_size'])
+        if deleted_count == 0:
+            self.stdout.write(self.style.SUCCESS('✅ No stale quiz attempts found'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'🗑️  Deleted {deleted_count} stale quiz attempts'))
@@ -1,9 +1,20 @@
 """
 Management command to regenerate quizzes using improved method
 """
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from django.core.management.base import BaseCommand
-from students.improved_quiz_generator import generate_quiz_with_textbook_questions
+from django.db import connections
+from students.improved_quiz_generator import (
+    agenerate_quiz_bulk,
+    completed_chapter_ids,
+    generate_quiz_with_textbook_questions,
+    generate_quizzes_batch,
+    invalidate_chapter_documents,
+    record_checkpoint,
+)
 from students.models import QuizChapter
+from students.quiz_workers import init_worker, regenerate_chapter
 import logging
 
 logger = logging.getLogger('students')
@@ -24,10 +35,42 @@ class Command(BaseCommand):
             dest='class_num',
             help='Regenerate for specific class (optional)',
         )
+        parser.add_argument(
+            '--batch',
+            action='store_true',
+            help='Submit all chapters as one Gemini/OpenAI Batch API job (slower turnaround, cheaper)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Regenerate up to N chapters at once (default: 1, sequential)',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Regenerate chapters in N worker processes (default: 1, no pool)',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            help='JSONL file of completed chapters; re-running with it resumes an interrupted run',
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Ignore and evict cached chapter chunks, cached chapter MCQs and cached LLM answers',
+        )
 
     def handle(self, *args, **options):
         chapter_id = options.get('chapter_id')
         class_num = options.get('class_num')
+        use_batch = options.get('batch')
+        concurrency = options.get('concurrency') or 1
+        processes = options.get('processes') or 1
+        checkpoint = options.get('checkpoint')
+        no_cache = options.get('no_cache')
         
         self.stdout.write(self.style.SUCCESS('🚀 Starting Quiz Regeneration'))
         self.stdout.write(self.style.WARNING('This will use textbook "Let us reflect" questions'))
@@ -37,13 +80,18 @@ class Command(BaseCommand):
             try:
                 chapter = QuizChapter.objects.get(chapter_id=chapter_id)
                 self.stdout.write(f'📖 Regenerating: {chapter.chapter_name}')
+                if no_cache:
+                    invalidate_chapter_documents(
+                        chapter.class_number.replace('Class ', ''), chapter.subject, chapter.chapter_name
+                    )
                 
                 result = generate_quiz_with_textbook_questions(
                     chapter_id=chapter.chapter_id,
                     class_num=chapter.class_number.replace('Class ', ''),
                     subject=chapter.subject,
                     chapter_name=chapter.chapter_name,
-                    chapter_order=chapter.chapter_order
+                    chapter_order=chapter.chapter_order,
+                    use_cache=not no_cache
                 )
                 
                 if result['success']:
@@ -59,15 +107,80 @@ class Command(BaseCommand):
         
         else:
             # Regenerate all chapters (or by class)
-            queryset = QuizChapter.objects.filter(is_active=True)
+            # Only the columns generation needs, streamed in chunks below
+            queryset = QuizChapter.objects.filter(is_active=True).only(
+                'chapter_id', 'class_number', 'subject', 'chapter_name', 'chapter_order'
+            )
             if class_num:
                 queryset = queryset.filter(class_number__contains=class_num)
             
             total = queryset.count()
             self.stdout.write(f'📚 Found {total} chapters to regenerate')
             
-            success_count = 0
-            for i, chapter in enumerate(queryset, 1):
+            skipped = 0
+            done = completed_chapter_ids(checkpoint)
+            if done:
+                queryset = queryset.exclude(chapter_id__in=done)
+                skipped = total - queryset.count()
+                self.stdout.write(f'⏭️  Skipping {skipped} chapters already completed in {checkpoint}')
+            
+            if no_cache:
+                self.stdout.write('🧹 Clearing cached chapter chunks...')
+                for chapter in queryset.iterator(chunk_size=100):
+                    invalidate_chapter_documents(
+                        chapter.class_number.replace('Class ', ''), chapter.subject, chapter.chapter_name
+                    )
+            
+            if use_batch or concurrency > 1 or processes > 1:
+                chapters = [
+                    {
+                        'chapter_id': chapter.chapter_id,
+                        'class_num': chapter.class_number.replace('Class ', ''),
+                        'subject': chapter.subject,
+                        'chapter_name': chapter.chapter_name,
+                        'chapter_order': chapter.chapter_order,
+                    }
+                    for chapter in queryset.iterator(chunk_size=100)
+                ]
+                if use_batch:
+                    self.stdout.write('📦 Submitting chapters as a batch job...')
+                    results = generate_quizzes_batch(chapters, use_cache=not no_cache)
+                    for result in results:
+                        record_checkpoint(checkpoint, result)
+                elif processes > 1:
+                    self.stdout.write(f'⚙️  Regenerating chapters in {processes} worker processes...')
+                    # Workers open their own connections; don't fork ours
+                    connections.close_all()
+                    results = []
+                    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker) as executor:
+                        futures = [executor.submit(regenerate_chapter, chapter, not no_cache) for chapter in chapters]
+                        for i, future in enumerate(as_completed(futures), 1):
+                            result = future.result()
+                            results.append(result)
+                            record_checkpoint(checkpoint, result)
+                            if result.get('success'):
+                                self.stdout.write(self.style.SUCCESS(
+                                    f'[{i}/{len(chapters)}] ✅ {result["chapter_id"]}: '
+                                    f'{result.get("total_questions", 0)} questions'
+                                ))
+                            else:
+                                self.stdout.write(self.style.ERROR(
+                                    f'[{i}/{len(chapters)}] ❌ {result["chapter_id"]}: {result.get("error")}'
+                                ))
+                else:
+                    self.stdout.write(f'⚡ Regenerating {concurrency} chapters at a time...')
+                    results = asyncio.run(agenerate_quiz_bulk(
+                        chapters, concurrency=concurrency, checkpoint_path=checkpoint,
+                        use_cache=not no_cache
+                    ))
+                success_count = skipped + sum(1 for result in results if result.get('success'))
+                self.stdout.write(self.style.SUCCESS(
+                    f'\n🎉 Completed: {success_count}/{total} chapters regenerated'
+                ))
+                return
+            
+            success_count = skipped
+            for i, chapter in enumerate(queryset.iterator(chunk_size=100), 1):
                 self.stdout.write(f'\n[{i}/{total}] {chapter.chapter_name}...')
                 
                 result = generate_quiz_with_textbook_questions(
@@ -75,8 +188,11 @@ class Command(BaseCommand):
                     class_num=chapter.class_number.replace('Class ', ''),
                     subject=chapter.subject,
                     chapter_name=chapter.chapter_name,
-                    chapter_order=chapter.chapter_order
+                    chapter_order=chapter.chapter_order,
+                    use_cache=not no_cache
                 )
+                result.setdefault('chapter_id', chapter.chapter_id)
+                record_checkpoint(checkpoint, result)
                 
                 if result['success']:
                     self.stdout.write(self.style.SUCCESS(
@@ -3,6 +3,7 @@ Management command to reset chapter unlock status for all students
 Only first chapter of each subject will be unlocked
 """
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.contrib.auth import get_user_model
 from students.models import StudentChapterProgress, QuizChapter
 
@@ -16,31 +17,19 @@ class Command(BaseCommand):
         self.stdout.write('\n🔒 Resetting Chapter Unlock Status...\n')
         self.stdout.write('=' * 60)
         
-        # Get all progress records
-        all_progress = StudentChapterProgress.objects.select_related('chapter', 'student').all()
+        # Only first chapter of each subject should be unlocked; everything
+        # else is locked. Two UPDATE queries instead of one save() per row.
+        to_unlock = StudentChapterProgress.objects.filter(chapter__chapter_order=1, is_unlocked=False)
+        to_lock = StudentChapterProgress.objects.exclude(chapter__chapter_order=1).filter(is_unlocked=True)
         
-        locked_count = 0
-        unlocked_count = 0
+        for email, chapter_name in to_unlock.values_list('student__email', 'chapter__chapter_name'):
+            self.stdout.write(f'🔓 Unlocked: {email} - {chapter_name}')
+        for email, chapter_name in to_lock.values_list('student__email', 'chapter__chapter_name'):
+            self.stdout.write(f'🔒 Locked: {email} - {chapter_name}')
         
-        for progress in all_progress:
-            # Only first chapter of each subject should be unlocked
-            if progress.chapter.chapter_order == 1:
-                if not progress.is_unlocked:
-                    progress.is_unlocked = True
-                    progress.save()
-                    unlocked_count += 1
-                    self.stdout.write(
-                        f'🔓 Unlocked: {progress.student.email} - {progress.chapter.chapter_name}'
-                    )
-            else:
-                # Lock all non-first chapters
-                if progress.is_unlocked:
-                    progress.is_unlocked = False
-                    progress.save()
-                    locked_count += 1
-                    self.stdout.write(
-                        f'🔒 Locked: {progress.student.email} - {progress.chapter.chapter_name}'
-                    )
+        with transaction.atomic():
+            unlocked_count = to_unlock.update(is_unlocked=True)
+            locked_count = to_lock.update(is_unlocked=False)
         
         self.stdout.write('\n' + '=' * 60)
         self.stdout.write(f'✅ Locked {locked_count} chapters')
@@ -2,9 +2,15 @@
 Django management command to setup MongoDB and ChromaDB
 Run this after configuring your MongoDB connection
 """
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+import json
+
 from django.core.management.base import BaseCommand
-from ncert_project.mongodb_utils import create_indexes, get_mongo_db
-from ncert_project.chromadb_utils import get_chromadb_manager
+
+# Chat turns handed to save_chats_to_mongo per insert_many
+BULK_LOAD_BATCH_SIZE = 5000
 
 
 class Command(BaseCommand):
@@ -16,63 +22,149 @@ class Command(BaseCommand):
             action='store_true',
             help='Clear ChromaDB collection (WARNING: Deletes all documents!)',
         )
+        parser.add_argument(
+            '--bulk-load',
+            metavar='JSONL_FILE',
+            help='Import chat turns (one JSON object per line with student_id, '
+                 'question, answer and optional metadata) into chat_history, '
+                 'with its secondary indexes dropped and rebuilt around the load',
+        )
+        parser.add_argument(
+            '--noinput', '--no-input',
+            action='store_false',
+            dest='interactive',
+            help='Do not prompt for confirmation',
+        )
     
     def handle(self, *args, **options):
-        self.stdout.write(self.style.SUCCESS('=' * 70))
-        self.stdout.write(self.style.SUCCESS('🚀 Setting up MongoDB and ChromaDB'))
-        self.stdout.write(self.style.SUCCESS('=' * 70))
+        # Static blocks are joined and written once
+        self.stdout.write('\n'.join([
+            self.style.SUCCESS('=' * 70),
+            self.style.SUCCESS('🚀 Setting up MongoDB and ChromaDB'),
+            self.style.SUCCESS('=' * 70),
+        ]))
         
-        # Setup MongoDB
+        if options['bulk_load']:
+            # Interactive and Mongo-only, so it stays on the main thread
+            self._bulk_load(options)
+            return
+        
+        # The two backends are independent; set them up concurrently and
+        # print each section's lines in a fixed order once both finish
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            mongo_future = executor.submit(self._setup_mongo)
+            chroma_future = executor.submit(self._setup_chroma, options['reset_chroma'])
+            self.stdout.write('\n'.join(mongo_future.result()))
+            self.stdout.write('\n'.join(chroma_future.result()))
+        
+        self.stdout.write('\n'.join([
+            '\n' + '=' * 70,
+            self.style.SUCCESS('✅ Setup complete!'),
+            '=' * 70,
+            '\n💡 Next steps:',
+            '   1. Add your API keys to .env file',
+            '   2. Upload NCERT books through the admin interface',
+            '   3. Books will be stored in ChromaDB with format: Class X, Subject: Y, Chapter: Z',
+            '   4. User/Admin data will be stored in MongoDB\n',
+        ]))
+    
+    def _bulk_load(self, options):
+        """Import chat turns into chat_history with its secondary indexes dropped"""
         self.stdout.write('\n📦 Setting up MongoDB...')
         try:
+            from ncert_project.mongodb_utils import bulk_load_indexes, get_mongo_db, save_chats_to_mongo
+            
             db = get_mongo_db()
             self.stdout.write(self.style.SUCCESS(f'✅ Connected to MongoDB: {db.name}'))
+            self.stdout.write(self.style.WARNING(
+                '⚠️  --bulk-load drops the non-unique chat_history indexes - chat history '
+                'queries will be slow until the load finishes and they are rebuilt'
+            ))
+            confirmed = not options['interactive'] or input('Continue? [y/N]: ').strip().lower() == 'y'
+            if not confirmed:
+                self.stdout.write('Skipped bulk load')
+                return
+            
+            loaded = 0
+            with open(options['bulk_load'], encoding='utf-8') as f:
+                chats = (self._chat_from_line(line) for line in f if line.strip())
+                # Indexes are rebuilt on exit, even if the load fails part way
+                with bulk_load_indexes(['chat_history']):
+                    while True:
+                        batch = list(islice(chats, BULK_LOAD_BATCH_SIZE))
+                        if not batch:
+                            break
+                        loaded += save_chats_to_mongo(batch)
+            self.stdout.write(self.style.SUCCESS(f'✅ Loaded {loaded} chats and rebuilt MongoDB indexes'))
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'❌ MongoDB Error: {str(e)}'))
+    
+    @staticmethod
+    def _chat_from_line(line):
+        """save_chats_to_mongo arguments from one JSONL line"""
+        chat = json.loads(line)
+        if isinstance(chat.get('created_at'), str):
+            chat['created_at'] = datetime.fromisoformat(chat['created_at'])
+        return chat
+    
+    def _setup_mongo(self):
+        """Connect to MongoDB and build indexes; returns the lines to print"""
+        lines = ['\n📦 Setting up MongoDB...']
+        try:
+            # Imported here so pymongo/chromadb load only when this command runs
+            from ncert_project.mongodb_utils import create_indexes, get_mongo_db
+            
+            db = get_mongo_db()
+            lines.append(self.style.SUCCESS(f'✅ Connected to MongoDB: {db.name}'))
             
             # Create indexes
-            self.stdout.write('Creating indexes...')
-            if create_indexes():
-                self.stdout.write(self.style.SUCCESS('✅ MongoDB indexes created successfully'))
+            lines.append('Creating indexes...')
+            index_counts = create_indexes()
+            if index_counts is not None:
+                lines.append(self.style.SUCCESS(
+                    f'✅ MongoDB indexes ready: {index_counts["created"]} created, '
+                    f'{index_counts["skipped"]} already existed'
+                ))
             else:
-                self.stdout.write(self.style.ERROR('❌ Failed to create MongoDB indexes'))
+                lines.append(self.style.ERROR('❌ Failed to create MongoDB indexes'))
             
             # Show collections
-            collections = db.list_collection_names()
-            self.stdout.write(f'\n📊 Available collections: {", ".join(collections) if collections else "None"}')
+            # Names only, in one listCollections round-trip
+            collections = [c['name'] for c in db.list_collections(nameOnly=True)]
+            lines.append(f'\n📊 Available collections: {", ".join(collections) if collections else "None"}')
             
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'❌ MongoDB Error: {str(e)}'))
-        
-        # Setup ChromaDB
-        self.stdout.write('\n\n📚 Setting up ChromaDB...')
+            lines.append(self.style.ERROR(f'❌ MongoDB Error: {str(e)}'))
+        return lines
+    
+    def _setup_chroma(self, reset_chroma):
+        """Connect to ChromaDB and collect its stats; returns the lines to print"""
+        lines = ['\n\n📚 Setting up ChromaDB...']
         try:
+            from ncert_project.chromadb_utils import get_chromadb_manager
+            
             chroma_manager = get_chromadb_manager()
             
-            if options['reset_chroma']:
-                self.stdout.write(self.style.WARNING('⚠️  Clearing ChromaDB collection...'))
+            if reset_chroma:
+                lines.append(self.style.WARNING('⚠️  Clearing ChromaDB collection...'))
                 chroma_manager.clear_collection()
-                self.stdout.write(self.style.SUCCESS('✅ ChromaDB collection cleared'))
+                lines.append(self.style.SUCCESS('✅ ChromaDB collection cleared'))
             
             # Show stats
             stats = chroma_manager.get_stats()
-            self.stdout.write(self.style.SUCCESS(f'✅ ChromaDB connected'))
-            self.stdout.write(f'\n📊 ChromaDB Statistics:')
-            self.stdout.write(f'   Total Documents: {stats.get("total_documents", 0)}')
-            self.stdout.write(f'   Total Classes: {stats.get("total_classes", 0)}')
+            lines.extend([
+                self.style.SUCCESS(f'✅ ChromaDB connected'),
+                f'\n📊 ChromaDB Statistics:',
+                f'   Total Documents: {stats.get("total_documents", 0)}',
+                f'   Total Classes: {stats.get("total_classes", 0)}',
+            ])
             
             if stats.get('classes'):
-                self.stdout.write(f'\n   Available Classes:')
+                lines.append(f'\n   Available Classes:')
                 for class_name in stats['classes']:
                     subjects = stats['subjects_by_class'].get(class_name, [])
-                    self.stdout.write(f'   - {class_name}: {", ".join(subjects) if subjects else "No subjects"}')
+                    lines.append(f'   - {class_name}: {", ".join(subjects) if subjects else "No subjects"}')
             
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f'❌ ChromaDB Error: {str(e)}'))
-        
-        self.stdout.write('\n' + '=' * 70)
-        self.stdout.write(self.style.SUCCESS('✅ Setup complete!'))
-        self.stdout.write('=' * 70)
-        self.stdout.write('\n💡 Next steps:')
-        self.stdout.write('   1. Add your API keys to .env file')
-        self.stdout.write('   2. Upload NCERT books through the admin interface')
-        self.stdout.write('   3. Books will be stored in ChromaDB with format: Class X, Subject: Y, Chapter: Z')
-        self.stdout.write('   4. User/Admin data will be stored in MongoDB\n')
+            lines.append(self.style.ERROR(f'❌ ChromaDB Error: {str(e)}'))
+        return lines
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0010_speakingsession'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='chatcache',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+    ]
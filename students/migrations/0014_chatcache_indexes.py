@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0013_alter_chathistory_student'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatcache',
+            index=models.Index(fields=['is_invalidated', 'expires_at'], name='chatcache_exp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='chatcache',
+            index=models.Index(fields=['-created_at'], name='chatcache_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('superadmin', '0001_initial'),
+        ('students', '0014_chatcache_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pdfimage',
+            index=models.Index(fields=['upload', 'page_number'], name='pdfimage_upload_page_idx'),
+        ),
+        migrations.AlterField(
+            model_name='pdfimage',
+            name='upload',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='images', to='superadmin.uploadedbook'),
+        ),
+        migrations.AlterField(
+            model_name='pdfimage',
+            name='chunk_id',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0015_pdfimage_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(condition=models.Q(('status', 'in_progress')), fields=['status'], name='qa_inprogress_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizanswer',
+            index=models.Index(condition=models.Q(('verification_status', 'pending')), fields=['verification_status'], name='qans_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0016_quiz_status_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='unittestattempt',
+            index=models.Index(fields=['student', 'status', '-started_at'], name='uta_student_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='unittestattempt',
+            index=models.Index(condition=models.Q(('status', 'submitted')), fields=['status', 'submitted_at'], name='uta_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='previousyearpaper',
+            index=models.Index(condition=models.Q(('status__in', ['uploaded', 'processing'])), fields=['status', 'uploaded_at'], name='pyp_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='previousyearpaper',
+            index=models.Index(fields=['student', '-uploaded_at'], name='pyp_student_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+
+
+def hex_to_digest(apps, schema_editor):
+    ChatCache = apps.get_model('students', 'ChatCache')
+    for entry in ChatCache.objects.only('pk', 'question_hash').iterator():
+        entry.question_digest = bytes.fromhex(entry.question_hash)
+        entry.save(update_fields=['question_digest'])
+
+
+def digest_to_hex(apps, schema_editor):
+    ChatCache = apps.get_model('students', 'ChatCache')
+    for entry in ChatCache.objects.only('pk', 'question_digest').iterator():
+        entry.question_hash = bytes(entry.question_digest).hex()
+        entry.save(update_fields=['question_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0017_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatcache',
+            name='question_digest',
+            field=models.BinaryField(max_length=16, null=True),
+        ),
+        # Nullable while both columns exist, so reversing RemoveField re-adds a
+        # column that digest_to_hex can fill before NOT NULL/unique come back
+        migrations.AlterField(
+            model_name='chatcache',
+            name='question_hash',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(hex_to_digest, digest_to_hex),
+        migrations.RemoveField(
+            model_name='chatcache',
+            name='question_hash',
+        ),
+        migrations.RenameField(
+            model_name='chatcache',
+            old_name='question_digest',
+            new_name='question_hash',
+        ),
+        migrations.AlterField(
+            model_name='chatcache',
+            name='question_hash',
+            field=models.BinaryField(max_length=16, unique=True),
+        ),
+    ]
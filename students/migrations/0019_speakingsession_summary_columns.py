@@ -0,0 +1,51 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def _total_count(items):
+    if isinstance(items, dict):
+        return sum(int(n or 0) for n in items.values())
+    return sum(int(item.get('count', 1) or 0) if isinstance(item, dict) else 1 for item in items or [])
+
+
+def backfill_summary_columns(apps, schema_editor):
+    SpeakingSession = apps.get_model('students', 'SpeakingSession')
+    sessions = SpeakingSession.objects.only('pk', 'duration', 'word_count', 'grammar_errors', 'filler_words')
+    for session in sessions.iterator():
+        session.filler_count = _total_count(session.filler_words)
+        session.grammar_error_count = _total_count(session.grammar_errors)
+        session.words_per_minute = round((session.word_count / session.duration) * 60, 1) if session.duration > 0 else 0
+        session.save(update_fields=['filler_count', 'grammar_error_count', 'words_per_minute'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('students', '0018_chatcache_binary_question_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speakingsession',
+            name='filler_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='speakingsession',
+            name='grammar_error_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='speakingsession',
+            name='words_per_minute',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(backfill_summary_columns, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='speakingsession',
+            index=models.Index(fields=['student', 'overall_score'], name='speaking_student_score_idx'),
+        ),
+    ]
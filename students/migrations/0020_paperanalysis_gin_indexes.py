@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations
+
+# GIN indexes only exist on PostgreSQL; the default SQLite database skips them
+GIN_INDEXES = [
+    ('paper_analysis_chapimp_gin', 'chapter_importance'),
+    ('paper_analysis_priority_gin', 'priority_chapters'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, column in GIN_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON students_paperanalysis '
+            f'USING GIN ({column} jsonb_path_ops)'
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _column in GIN_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0019_speakingsession_summary_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0020_paperanalysis_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='unittestanswer',
+            name='marks_obtained',
+        ),
+    ]
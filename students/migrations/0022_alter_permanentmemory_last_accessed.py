@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0021_remove_unittestanswer_marks_obtained'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='permanentmemory',
+            name='last_accessed',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('students', '0022_alter_permanentmemory_last_accessed'),
+    ]
+
+    operations = [
+        # Build the replacement first so the lookup is never unindexed
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['student', 'chapter', '-started_at'], include=['score_percentage', 'is_passed'], name='quizattempt_covering_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='quizattempt',
+            name='students_qu_student_2456a5_idx',
+        ),
+    ]
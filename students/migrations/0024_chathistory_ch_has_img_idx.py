@@ -0,0 +1,19 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('students', '0023_quizattempt_covering_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chathistory',
+            index=models.Index(condition=models.Q(('has_images', True)), fields=['student', '-created_at'], name='ch_has_img_idx'),
+        ),
+    ]
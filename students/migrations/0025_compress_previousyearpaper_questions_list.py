@@ -0,0 +1,50 @@
+# Generated by Django 4.2.11 on 2026-10-16 12:00
+
+from django.db import migrations, models
+import students.fields
+
+
+def copy_to_compressed(apps, schema_editor):
+    PreviousYearPaper = apps.get_model('students', 'PreviousYearPaper')
+    papers = PreviousYearPaper.objects.exclude(questions_list=None).only('pk', 'questions_list')
+    for paper in papers.iterator():
+        paper.questions_list_z = paper.questions_list
+        paper.save(update_fields=['questions_list_z'])
+
+
+def copy_from_compressed(apps, schema_editor):
+    PreviousYearPaper = apps.get_model('students', 'PreviousYearPaper')
+    papers = PreviousYearPaper.objects.exclude(questions_list_z=None).only('pk', 'questions_list_z')
+    for paper in papers.iterator():
+        paper.questions_list = paper.questions_list_z
+        paper.save(update_fields=['questions_list'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('students', '0024_chathistory_ch_has_img_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='previousyearpaper',
+            name='questions_list_z',
+            field=students.fields.CompressedJSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(copy_to_compressed, copy_from_compressed),
+        migrations.RemoveField(
+            model_name='previousyearpaper',
+            name='questions_list',
+        ),
+        migrations.RenameField(
+            model_name='previousyearpaper',
+            old_name='questions_list_z',
+            new_name='questions_list',
+        ),
+        migrations.AlterField(
+            model_name='previousyearpaper',
+            name='questions_list',
+            field=students.fields.CompressedJSONField(blank=True, help_text='Extracted questions', null=True),
+        ),
+    ]
@@ -1,10 +1,82 @@
 from django.db import models
+from django.db.models.functions import Now, Substr
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from .fields import CompressedJSONField
 from datetime import timedelta
+import logging
+import time
+
+logger = logging.getLogger('students')
+
+# ChatCache front cache: hot entries are served from the shared Django cache
+# and their hit counts are counted there, then drained by drain_chat_cache_hits
+CHAT_FRONT_CACHE_TTL = 10 * 60  # seconds
+# Undrained counters outlive a beat outage of up to a day
+CHAT_HIT_KEY_TTL = 24 * 60 * 60  # seconds
+# Hit pks are logged per interval, so a drain only visits entries that were hit
+CHAT_HIT_LOG_INTERVAL = 60  # seconds
+
+# Cache backends that every web worker shares. A per-process cache (LocMem)
+# would keep serving an entry after another worker invalidated it
+SHARED_CACHE_BACKENDS = ('redis', 'memcached')
+
+
+def front_cache_enabled():
+    """Whether the default cache is shared between workers"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '').lower()
+    return any(name in backend for name in SHARED_CACHE_BACKENDS)
+
+
+def chat_hit_interval():
+    """Number of the current hit-log interval"""
+    return int(time.time() // CHAT_HIT_LOG_INTERVAL)
+
+
+def log_chat_cache_hit(pk):
+    """
+    Add a ChatCache pk to the current interval's hit log: a counter of slots
+    plus one key per slot, so concurrent workers never overwrite each other
+    """
+    interval = chat_hit_interval()
+    size_key = ChatCache.hit_log_size_key(interval)
+    cache.add(size_key, 0, CHAT_HIT_KEY_TTL)
+    slot = cache.incr(size_key)
+    cache.set(ChatCache.hit_log_slot_key(interval, slot), pk, CHAT_HIT_KEY_TTL)
+
+class ChatHistoryManager(models.Manager):
+    def bulk_log(self, records, batch_size=500):
+        """
+        Insert many chat turns at once (imports, replays, buffered turns)
+        One INSERT per `batch_size` rows instead of one per turn
+        """
+        return self.bulk_create(records, batch_size=batch_size)
+
+    def listing(self, preview_chars=500):
+        """
+        Rows for chat lists: the full answer and sources stay in the database,
+        only an `answer_preview` prefix is fetched
+        """
+        return self.defer('answer', 'sources').annotate(answer_preview=Substr('answer', 1, preview_chars))
+
+
+class ChatCacheManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create skips save(), so stamp expiry on new entries here"""
+        objs = list(objs)
+        for obj in objs:
+            if not obj.pk:
+                obj.set_expiry()
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 class ChatHistory(models.Model):
-    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # Rows are inserted on every chat turn, so indexes are kept to what the
+    # queries use: chat_student_recent_idx (student, -created_at) also serves
+    # plain student lookups, making the FK's own index redundant. Nothing
+    # filters on model_used, so it stays unindexed.
+    student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     question = models.TextField()
     answer = models.TextField()
     model_used = models.CharField(max_length=20, default='openai')
@@ -14,12 +86,28 @@ class ChatHistory(models.Model):
     sources = models.JSONField(null=True, blank=True)  # Store reference links
     difficulty_level = models.CharField(max_length=20, default='normal')  # simple, normal, advanced
 
+    objects = ChatHistoryManager()
+
     def __str__(self):
         return f"{self.student.email} - {self.question[:30]}"
 
     class Meta:
         verbose_name_plural = "Chat Histories"
         ordering = ['-created_at']
+        indexes = [
+            # "Latest chats for this student" - equality first, sort field last
+            models.Index(fields=['student', '-created_at'], name='chat_student_recent_idx'),
+            # Partial: only turns that returned images, so inserts without
+            # images never touch it
+            models.Index(fields=['student', '-created_at'], condition=models.Q(has_images=True), name='ch_has_img_idx'),
+        ]
+
+
+# Columns get_active_cache loads for a hit
+ACTIVE_CACHE_FIELDS = (
+    'id', 'question_hash', 'answer', 'images', 'sources', 'difficulty_level',
+    'hit_count', 'expires_at', 'is_invalidated',
+)
 
 
 class ChatCache(models.Model):
@@ -33,7 +121,7 @@ class ChatCache(models.Model):
     - Allow manual invalidation via feedback
     - Automatic expiry for low-quality answers
     """
-    question_hash = models.CharField(max_length=64, unique=True, db_index=True)  # MD5 hash of normalized question
+    question_hash = models.BinaryField(max_length=16, unique=True)  # Raw 16-byte MD5 digest of normalized question
     question = models.TextField()
     answer = models.TextField()
     images = models.JSONField(null=True, blank=True)  # List of image URLs/paths
@@ -45,25 +133,51 @@ class ChatCache(models.Model):
     rag_relevance = models.FloatField(default=0.0)  # Average RAG chunk relevance
     negative_feedback_count = models.IntegerField(default=0)  # Track bad feedback
     created_at = models.DateTimeField(auto_now_add=True)
-    expires_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)  # Range-scanned by cleanup_cache
     is_invalidated = models.BooleanField(default=False)  # Manual invalidation flag
 
+    objects = ChatCacheManager()
+
     def __str__(self):
         return f"Cache: {self.question[:50]} (Quality: {self.quality_score:.2f})"
 
+    @staticmethod
+    def ttl_for(has_rag_context, quality_score):
+        """How long an answer stays cached, based on its quality"""
+        if has_rag_context and quality_score >= 0.7:
+            # High-quality RAG answers: 10 days cache
+            return timedelta(days=10)
+        if has_rag_context and quality_score >= 0.5:
+            # Medium-quality RAG answers: 3 days cache
+            return timedelta(days=3)
+        # Low-quality or non-RAG answers: 1 day cache only
+        return timedelta(days=1)
+
+    def set_expiry(self):
+        self.expires_at = timezone.now() + self.ttl_for(self.has_rag_context, self.quality_score)
+
     def save(self, *args, **kwargs):
         # Set expiration date based on quality (only if not already set)
         if not self.pk or not self.expires_at:  # New object or expires_at not set
-            if self.has_rag_context and self.quality_score >= 0.7:
-                # High-quality RAG answers: 10 days cache
-                self.expires_at = timezone.now() + timedelta(days=10)
-            elif self.has_rag_context and self.quality_score >= 0.5:
-                # Medium-quality RAG answers: 3 days cache
-                self.expires_at = timezone.now() + timedelta(days=3)
-            else:
-                # Low-quality or non-RAG answers: 1 day cache only
-                self.expires_at = timezone.now() + timedelta(days=1)
+            self.set_expiry()
         super().save(*args, **kwargs)
+        cache.delete(self.front_cache_key(self.question_hash))
+
+    @staticmethod
+    def front_cache_key(question_hash):
+        return f"chatq:{bytes(question_hash).hex()}"
+
+    @staticmethod
+    def hit_count_key(pk):
+        return f"chatq:hits:{pk}"
+
+    @staticmethod
+    def hit_log_size_key(interval):
+        return f"chatq:hitlog:{interval}"
+
+    @staticmethod
+    def hit_log_slot_key(interval, slot):
+        return f"chatq:hitlog:{interval}:{slot}"
 
     def is_expired(self):
         """Check if cache is expired or invalidated"""
@@ -72,40 +186,101 @@ class ChatCache(models.Model):
     def invalidate(self):
         """Manually invalidate this cache entry (wrong answer reported)"""
         self.is_invalidated = True
-        self.save()
+        # Narrow UPDATE of the flag instead of rewriting answer/images/sources
+        self.save(update_fields=['is_invalidated'])
 
     def report_negative_feedback(self):
         """Track negative feedback - auto-invalidate after 2 reports"""
-        self.negative_feedback_count += 1
-        if self.negative_feedback_count >= 2:
-            self.invalidate()
-        self.save()
+        # One atomic UPDATE; the CASE sees the pre-increment count, so
+        # "already >= 1" means this report is the second
+        ChatCache.objects.filter(pk=self.pk).update(
+            negative_feedback_count=models.F('negative_feedback_count') + 1,
+            is_invalidated=models.Case(
+                models.When(negative_feedback_count__gte=1, then=models.Value(True)),
+                default=models.F('is_invalidated'),
+            ),
+        )
+        self.refresh_from_db(fields=['negative_feedback_count', 'is_invalidated'])
+        cache.delete(self.front_cache_key(self.question_hash))
 
     @classmethod
     def get_active_cache(cls, question_hash):
         """Get non-expired, non-invalidated cache entry with quality check"""
-        try:
-            cache = cls.objects.get(question_hash=question_hash)
-            
-            # Check expiration and invalidation
-            if cache.is_expired():
-                cache.delete()
+        use_front_cache = front_cache_enabled()
+        key = cls.front_cache_key(question_hash)
+        entry = None
+        if use_front_cache:
+            try:
+                entry = cache.get(key)
+            except Exception as e:
+                logger.warning(f"[WARNING]  Chat front cache unavailable: {e}")
+                use_front_cache = False
+        if entry is None or entry.is_expired():
+            # Stale rows simply don't match here; purge_expired_chatcache deletes
+            # them in bulk so a cache read never turns into a DELETE
+            # Only what a hit serves plus what is_expired() needs; the unique
+            # index on question_hash already makes this a single-row lookup
+            entry = cls.objects.filter(
+                question_hash=question_hash,
+                expires_at__gt=timezone.now(),
+                is_invalidated=False,
+                # Quality gate: Don't use low-quality cache with negative feedback
+                quality_score__gte=0.3,
+                negative_feedback_count__lt=2,
+            ).only(*ACTIVE_CACHE_FIELDS).first()
+            if entry is None:
                 return None
-            
-            # Quality gate: Don't use low-quality cache with negative feedback
-            if cache.quality_score < 0.3 or cache.negative_feedback_count >= 2:
-                cache.delete()
-                return None
-            
-            cache.hit_count += 1
-            cache.save()
-            return cache
-        except cls.DoesNotExist:
-            return None
+            # Never keep it in the front cache past its own expiry
+            ttl = min(CHAT_FRONT_CACHE_TTL, int((entry.expires_at - timezone.now()).total_seconds()))
+            if use_front_cache and ttl > 0:
+                cache.set(key, entry, ttl)
+        
+        entry.record_hit(use_front_cache)
+        return entry
+
+    def record_hit(self, use_front_cache):
+        """
+        Count one cache hit: in the shared cache (drained to the row by
+        drain_chat_cache_hits), or straight on the row without a front cache
+        """
+        if use_front_cache:
+            key = self.hit_count_key(self.pk)
+            try:
+                cache.add(key, 0, CHAT_HIT_KEY_TTL)
+                hits = cache.incr(key)
+            except Exception as e:
+                # Losing a counter must not lose the hit - fall back to the row
+                logger.warning(f"[WARNING]  Could not count chat cache hit in cache: {e}")
+            else:
+                if hits == 1:
+                    # First undrained hit - log the pk so the drain visits it
+                    try:
+                        log_chat_cache_hit(self.pk)
+                    except Exception as e:
+                        logger.warning(f"[WARNING]  Could not log chat cache hit: {e}")
+                self.hit_count += 1
+                return
+        ChatCache.objects.filter(pk=self.pk).update(hit_count=models.F('hit_count') + 1)
+        self.hit_count += 1
+
+    @classmethod
+    def stale_entries(cls):
+        """Expired, invalidated or low-quality entries that get_active_cache ignores"""
+        return cls.objects.filter(
+            models.Q(expires_at__lte=timezone.now())
+            | models.Q(is_invalidated=True)
+            | models.Q(quality_score__lt=0.3)
+            | models.Q(negative_feedback_count__gte=2)
+        )
 
     class Meta:
         verbose_name_plural = "Chat Caches"
         ordering = ['-created_at']
+        indexes = [
+            # Active/invalidated sweeps filter on the flag, then range-scan expiry
+            models.Index(fields=['is_invalidated', 'expires_at'], name='chatcache_exp_idx'),
+            models.Index(fields=['-created_at'], name='chatcache_recent_idx'),
+        ]
 
 
 class PermanentMemory(models.Model):
@@ -121,12 +296,19 @@ class PermanentMemory(models.Model):
     sources = models.JSONField(null=True, blank=True)
     keywords = models.TextField(help_text="Keywords for quick search")
     created_at = models.DateTimeField(auto_now_add=True)
-    last_accessed = models.DateTimeField(auto_now=True)
+    last_accessed = models.DateTimeField(default=timezone.now)  # Bumped by touch(), not on every save
     access_count = models.IntegerField(default=0)
 
     def __str__(self):
         return f"{self.student.email} - Memory: {self.question[:30]}"
 
+    def touch(self):
+        """Record an access with one atomic UPDATE of the two counters"""
+        type(self).objects.filter(pk=self.pk).update(
+            last_accessed=Now(),
+            access_count=models.F('access_count') + 1,
+        )
+
     class Meta:
         verbose_name_plural = "Permanent Memories"
         ordering = ['-last_accessed']
@@ -140,10 +322,11 @@ class PDFImage(models.Model):
     Images extracted from uploaded PDFs
     Linked to specific chunks in ChromaDB
     """
-    upload = models.ForeignKey('superadmin.UploadedBook', on_delete=models.CASCADE, related_name='images')
+    # Leading column of pdfimage_upload_page_idx, which also serves upload lookups
+    upload = models.ForeignKey('superadmin.UploadedBook', on_delete=models.CASCADE, related_name='images', db_index=False)
     image = models.ImageField(upload_to='pdf_images/')
     page_number = models.IntegerField()
-    chunk_id = models.CharField(max_length=255, null=True, blank=True)  # Link to ChromaDB chunk
+    chunk_id = models.CharField(max_length=255, null=True, blank=True, db_index=True)  # Link to ChromaDB chunk
     caption = models.TextField(null=True, blank=True)
     image_type = models.CharField(max_length=50, default='diagram')  # diagram, chart, table, illustration
     created_at = models.DateTimeField(auto_now_add=True)
@@ -153,6 +336,9 @@ class PDFImage(models.Model):
 
     class Meta:
         ordering = ['upload', 'page_number']
+        indexes = [
+            models.Index(fields=['upload', 'page_number'], name='pdfimage_upload_page_idx'),
+        ]
 
 
 # ==================== QUIZ SYSTEM MODELS ====================
@@ -184,6 +370,12 @@ class QuizChapter(models.Model):
         ]
 
 
+class QuizQuestionLiteManager(models.Manager):
+    """Questions without rag_context, which is only needed at generation time"""
+    def get_queryset(self):
+        return super().get_queryset().defer('rag_context')
+
+
 class QuizQuestion(models.Model):
     """
     Quiz questions with multiple variants for re-attempts
@@ -202,6 +394,9 @@ class QuizQuestion(models.Model):
     rag_context = models.TextField(help_text="ChromaDB content used to generate this question")
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = models.Manager()
+    lite = QuizQuestionLiteManager()  # Quiz-serving paths
+    
     def __str__(self):
         return f"{self.chapter.chapter_name} - Q{self.question_number} - {self.topic}"
     
@@ -297,7 +492,15 @@ class QuizAttempt(models.Model):
     class Meta:
         ordering = ['-started_at']
         indexes = [
-            models.Index(fields=['student', 'chapter', '-started_at']),
+            # Covering on PostgreSQL: best-score/pass lookups are index-only
+            # (INCLUDE is ignored on backends without covering indexes)
+            models.Index(
+                fields=['student', 'chapter', '-started_at'],
+                include=['score_percentage', 'is_passed'],
+                name='quizattempt_covering_idx',
+            ),
+            # Partial: only the small set of unfinished attempts is indexed
+            models.Index(fields=['status'], condition=models.Q(status='in_progress'), name='qa_inprogress_idx'),
         ]
 
 
@@ -327,6 +530,10 @@ class QuizAnswer(models.Model):
     class Meta:
         ordering = ['attempt', 'question__question_number']
         unique_together = ['attempt', 'question']
+        indexes = [
+            # Partial: only answers still awaiting RAG verification are indexed
+            models.Index(fields=['verification_status'], condition=models.Q(verification_status='pending'), name='qans_pending_idx'),
+        ]
 
 
 # ==================== UNIT TEST MODELS ====================
@@ -353,15 +560,19 @@ class UnitTest(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
     
+    # Both helpers iterate chapters.all() so they reuse prefetch_related('chapters')
+    # (one query per object otherwise) instead of slicing/counting/ordering in SQL
     def __str__(self):
-        chapter_names = ", ".join([ch.chapter_name for ch in self.chapters.all()[:3]])
-        if self.chapters.count() > 3:
+        chapters = list(self.chapters.all())
+        chapter_names = ", ".join([ch.chapter_name for ch in chapters[:3]])
+        if len(chapters) > 3:
             chapter_names += "..."
         return f"{self.title} - {chapter_names}"
     
     def get_chapters_display(self):
         """Get formatted string of all chapters"""
-        return ", ".join([f"Ch{ch.chapter_number}" for ch in self.chapters.all().order_by('chapter_number')])
+        chapters = sorted(self.chapters.all(), key=lambda ch: ch.chapter_number)
+        return ", ".join([f"Ch{ch.chapter_number}" for ch in chapters])
     
     class Meta:
         ordering = ['-created_at']
@@ -442,6 +653,10 @@ class UnitTestAttempt(models.Model):
         ordering = ['-started_at']
         indexes = [
             models.Index(fields=['student', 'unit_test', '-started_at']),
+            # Per-student evaluated history (admin profile, test analyzer)
+            models.Index(fields=['student', 'status', '-started_at'], name='uta_student_status_idx'),
+            # Partial: attempts waiting for evaluation
+            models.Index(fields=['status', 'submitted_at'], condition=models.Q(status='submitted'), name='uta_submitted_idx'),
         ]
 
 
@@ -459,7 +674,6 @@ class UnitTestAnswer(models.Model):
     awarded_marks = models.FloatField(default=0, help_text="Total marks awarded for this answer")
     content_score = models.FloatField(default=0, help_text="Content accuracy (0-1)")
     grammar_score = models.FloatField(default=0, help_text="Grammar and language quality (0-1)")
-    marks_obtained = models.FloatField(default=0)  # Deprecated: use awarded_marks
     
     # AI Feedback (NEW: combined AI feedback)
     ai_feedback = models.TextField(null=True, blank=True, help_text="Detailed AI-generated feedback")
@@ -518,7 +732,7 @@ class PreviousYearPaper(models.Model):
     # Extracted data
     extracted_text = models.TextField(null=True, blank=True)
     total_questions = models.IntegerField(default=0)
-    questions_list = models.JSONField(null=True, blank=True, help_text="Extracted questions")
+    questions_list = CompressedJSONField(null=True, blank=True, help_text="Extracted questions")
     
     # Timestamps
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -529,6 +743,15 @@ class PreviousYearPaper(models.Model):
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            # Partial: only papers still queued or being processed
+            models.Index(
+                fields=['status', 'uploaded_at'],
+                condition=models.Q(status__in=['uploaded', 'processing']),
+                name='pyp_pending_idx',
+            ),
+            models.Index(fields=['student', '-uploaded_at'], name='pyp_student_recent_idx'),
+        ]
 
 
 class PaperAnalysis(models.Model):
@@ -644,6 +867,12 @@ class SpeakingSession(models.Model):
         help_text="Exchanges that need improvement"
     )
     
+    # Summary columns derived from the JSON above on save, so analytics can
+    # aggregate in SQL instead of decoding every blob
+    filler_count = models.IntegerField(default=0)
+    grammar_error_count = models.IntegerField(default=0)
+    words_per_minute = models.FloatField(default=0)
+    
     # Metadata
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -652,11 +881,28 @@ class SpeakingSession(models.Model):
         verbose_name_plural = "Speaking Sessions"
         indexes = [
             models.Index(fields=['student', '-created_at']),
+            models.Index(fields=['student', 'overall_score'], name='speaking_student_score_idx'),
         ]
     
     def __str__(self):
         return f"{self.student.email} - {self.get_practice_type_display()} - {self.overall_score}/100"
     
+    @staticmethod
+    def _total_count(items):
+        """Sum occurrences in [{'count': n}, ...] or {word: n} analysis data"""
+        if isinstance(items, dict):
+            return sum(int(n or 0) for n in items.values())
+        return sum(int(item.get('count', 1) or 0) if isinstance(item, dict) else 1 for item in items or [])
+    
+    def save(self, *args, **kwargs):
+        self.filler_count = self._total_count(self.filler_words)
+        self.grammar_error_count = self._total_count(self.grammar_errors)
+        self.words_per_minute = round((self.word_count / self.duration) * 60, 1) if self.duration > 0 else 0
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'filler_count', 'grammar_error_count', 'words_per_minute'}
+        super().save(*args, **kwargs)
+    
     def get_duration_display(self):
         """Return duration in human-readable format"""
         minutes = self.duration // 60
@@ -664,8 +910,6 @@ class SpeakingSession(models.Model):
         return f"{minutes}m {seconds}s"
     
     def get_speaking_rate_display(self):
-        """Calculate words per minute"""
-        if self.duration > 0:
-            return round((self.word_count / self.duration) * 60, 1)
-        return 0
+        """Words per minute (precomputed on save)"""
+        return self.words_per_minute
 
@@ -3,6 +3,7 @@ Previous Year Paper Analyzer
 Extracts questions from uploaded PDFs and analyzes them using RAG
 to identify important chapters, topics, and questions for exam preparation
 """
+import io
 import logging
 import re
 import time
@@ -38,21 +39,45 @@ class PaperAnalyzer:
             self.chromadb_manager = get_chromadb_manager()
         return self.chromadb_manager
     
+    @staticmethod
+    def _page_may_have_text(page, min_stream_bytes: int = 200) -> bool:
+        """
+        Cheap pre-check before extract_text(): a page whose content stream is
+        tiny and which draws no XObjects (text can live inside form XObjects)
+        cannot contain a meaningful amount of text
+        """
+        try:
+            contents = page.get_contents()
+            stream_len = len(contents.get_data()) if contents is not None else 0
+            if stream_len >= min_stream_bytes:
+                return True
+            resources = page.get('/Resources') or {}
+            return '/XObject' in resources
+        except Exception:
+            return True  # When in doubt, let extract_text() decide
+    
     def extract_text_from_pdf(self, pdf_path: str) -> str:
         """Extract text from PDF file"""
         try:
             logger.info(f"📄 Extracting text from PDF: {pdf_path}")
             
+            # One sequential read, then parse from RAM (PdfReader seeks a lot)
             with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                text = ""
-                
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    text += page.extract_text() + "\n\n"
-                
-                logger.info(f"✅ Extracted {len(text)} characters from {len(pdf_reader.pages)} pages")
-                return text.strip()
+                pdf_bytes = io.BytesIO(file.read())
+            
+            pdf_reader = PyPDF2.PdfReader(pdf_bytes)
+            
+            # Collect page texts and join once (repeated += is quadratic on long papers)
+            page_texts = []
+            for page_num in range(len(pdf_reader.pages)):
+                page = pdf_reader.pages[page_num]
+                if not self._page_may_have_text(page):
+                    continue  # Blank/divider page - skip the expensive extract_text()
+                page_texts.append(page.extract_text())
+            text = "\n\n".join(page_texts)
+            
+            logger.info(f"✅ Extracted {len(text)} characters from {len(pdf_reader.pages)} pages")
+            return text.strip()
                 
         except Exception as e:
             logger.error(f"❌ Error extracting PDF text: {str(e)}")
@@ -2,6 +2,7 @@
 Quiz Generation Utilities
 Auto-generates quiz questions from ChromaDB content
 """
+import json
 import logging
 import re
 from typing import List, Dict
@@ -12,6 +13,62 @@ from django.conf import settings
 
 logger = logging.getLogger('students')
 
+# orjson is optional; its JSONDecodeError subclasses json.JSONDecodeError
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# JSON repair passes for malformed model output
+_TRAILING_COMMA_RE = re.compile(r',(\s*[}\]])')
+_UNQUOTED_KEY_RE = re.compile(r'(\{|,)\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:')
+
+# Response schema for Gemini structured output: a JSON array of MCQs with
+# 5 variants each (same shape as the prompt's OUTPUT FORMAT)
+_VARIANT_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'question': {'type': 'STRING'},
+        'options': {
+            'type': 'OBJECT',
+            'properties': {key: {'type': 'STRING'} for key in ('A', 'B', 'C', 'D')},
+            'required': ['A', 'B', 'C', 'D'],
+        },
+        'correct': {'type': 'STRING', 'enum': ['A', 'B', 'C', 'D']},
+        'explanation': {'type': 'STRING'},
+    },
+    'required': ['question', 'options', 'correct', 'explanation'],
+}
+
+QUIZ_RESPONSE_SCHEMA = {
+    'type': 'ARRAY',
+    'items': {
+        'type': 'OBJECT',
+        'properties': {
+            'original_question': {'type': 'STRING'},
+            'topic': {'type': 'STRING'},
+            'difficulty': {'type': 'STRING', 'enum': ['easy', 'medium', 'hard']},
+            'rag_context': {'type': 'STRING'},
+            'variants': {'type': 'ARRAY', 'items': _VARIANT_SCHEMA},
+        },
+        'required': ['topic', 'difficulty', 'rag_context', 'variants'],
+    },
+}
+
+
+def _supports_structured_output() -> bool:
+    """Whether the installed google-generativeai accepts response_mime_type/response_schema"""
+    try:
+        genai.types.GenerationConfig(response_mime_type='application/json', response_schema=QUIZ_RESPONSE_SCHEMA)
+        return True
+    except Exception:
+        return False
+
+
+# Older SDKs (e.g. the pinned 0.3.2) lack JSON mode; the repair path covers them
+STRUCTURED_OUTPUT = _supports_structured_output()
+
 
 def generate_quiz_from_chromadb(chapter_id: str, class_num: str, subject: str, chapter_name: str, chapter_order: int) -> Dict:
     """
@@ -125,9 +182,7 @@ def generate_quiz_from_chromadb(chapter_id: str, class_num: str, subject: str, c
         }
         
     except Exception as e:
-        logger.error(f"❌ Error generating quiz for {chapter_id}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error generating quiz for {chapter_id}: {e}")
         return {"success": False, "error": str(e)}
 
 
@@ -270,13 +325,15 @@ Generate EXACTLY {num_questions} questions. Return ONLY the JSON array, no other
             for attempt in range(max_retries):
                 try:
                     model = genai.GenerativeModel('gemini-2.5-flash')
-                    response = model.generate_content(
-                        prompt,
-                        generation_config={
-                            'temperature': 0.3,
-                            'top_p': 0.8,
-                        }
-                    )
+                    generation_config = {
+                        'temperature': 0.3,
+                        'top_p': 0.8,
+                    }
+                    if STRUCTURED_OUTPUT:
+                        # Model emits schema-valid JSON, so no repair pass is needed
+                        generation_config['response_mime_type'] = 'application/json'
+                        generation_config['response_schema'] = QUIZ_RESPONSE_SCHEMA
+                    response = model.generate_content(prompt, generation_config=generation_config)
                     result_text = response.text
                     logger.info(f"✅ Gemini generated quiz questions (attempt {attempt + 1})")
                     break
@@ -291,7 +348,6 @@ Generate EXACTLY {num_questions} questions. Return ONLY the JSON array, no other
             return []
         
         # Parse JSON response with error recovery
-        import json
         result_text = result_text.strip()
         if result_text.startswith("```json"):
             result_text = result_text[7:]
@@ -303,16 +359,20 @@ Generate EXACTLY {num_questions} questions. Return ONLY the JSON array, no other
         
         questions_data = None
         try:
-            questions_data = json.loads(result_text)
+            questions_data = _json_loads(result_text)
             logger.info(f"✅ Parsed {len(questions_data)} questions")
         except json.JSONDecodeError as e:
+            if STRUCTURED_OUTPUT:
+                # Schema-constrained output only fails to parse when truncated
+                logger.error(f"❌ Structured output was not valid JSON (truncated?): {e.msg}")
+                return []
             logger.warning(f"⚠️ JSON parse error: {e.msg} at line {e.lineno}")
             # Try to fix common issues
             fixed_text = result_text
-            fixed_text = re.sub(r',(\s*[}\]])', r'\1', fixed_text)  # Remove trailing commas
-            fixed_text = re.sub(r'(\{|,)\s*([a-zA-Z_][a-zA-Z0-9_]*)\s*:', r'\1"\2":', fixed_text)  # Quote keys
+            fixed_text = _TRAILING_COMMA_RE.sub(r'\1', fixed_text)  # Remove trailing commas
+            fixed_text = _UNQUOTED_KEY_RE.sub(r'\1"\2":', fixed_text)  # Quote keys
             try:
-                questions_data = json.loads(fixed_text)
+                questions_data = _json_loads(fixed_text)
                 logger.info(f"✅ Fixed and parsed {len(questions_data)} questions")
             except:
                 logger.error(f"❌ Could not fix JSON, returning empty")
@@ -328,9 +388,7 @@ Generate EXACTLY {num_questions} questions. Return ONLY the JSON array, no other
         return questions_data[:num_questions]  # Take first num_questions
         
     except Exception as e:
-        logger.error(f"❌ Error in AI question generation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error in AI question generation: {e}")
         return None
 
 
@@ -378,7 +436,5 @@ def scan_and_generate_quizzes_for_existing_content():
         return results
         
     except Exception as e:
-        logger.error(f"❌ Error scanning ChromaDB: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception(f"❌ Error scanning ChromaDB: {e}")
         return []
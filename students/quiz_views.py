@@ -154,7 +154,7 @@ def start_quiz(request, chapter_id):
         )
         
         # Load questions with appropriate variants
-        questions = QuizQuestion.objects.filter(chapter=chapter).order_by('question_number')
+        questions = QuizQuestion.lite.filter(chapter=chapter).order_by('question_number')
         
         # Check if chapter has questions
         if not questions.exists():
@@ -232,7 +232,7 @@ def submit_quiz(request, attempt_id):
         all_answers = []
         
         for ans_data in submitted_answers:
-            question = get_object_or_404(QuizQuestion, id=ans_data['question_id'])
+            question = get_object_or_404(QuizQuestion.lite, id=ans_data['question_id'])
             variant = get_object_or_404(QuestionVariant, id=ans_data['variant_id'])
             selected = ans_data['selected_answer']
             
@@ -510,7 +510,10 @@ def quiz_results(request, attempt_id):
     user = request.user
     attempt = get_object_or_404(QuizAttempt, id=attempt_id, student=user)
     
-    answers = attempt.answers.all().select_related('question', 'variant_used').order_by('question__question_number')
+    answers = (
+        attempt.answers.all().select_related('question', 'variant_used')
+        .defer('question__rag_context').order_by('question__question_number')
+    )
     
     # Calculate derived values
     correct_count = attempt.correct_answers
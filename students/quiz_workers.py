@@ -0,0 +1,33 @@
+"""
+Process-pool workers for bulk quiz regeneration
+No Django imports at module level, so spawned worker processes can import
+this module before django.setup() has run
+"""
+from typing import Dict
+
+
+def init_worker():
+    """
+    Set up Django in a worker process with its own database connections
+    (connections inherited through fork must not be shared with the parent)
+    """
+    import django
+    from django.db import connections
+    
+    django.setup()
+    connections.close_all()
+
+
+def regenerate_chapter(chapter: Dict, use_cache: bool = True) -> Dict:
+    """
+    Regenerate one chapter's quiz in a worker process
+    `chapter` needs: chapter_id, class_num, subject, chapter_name, chapter_order
+    """
+    from students.improved_quiz_generator import generate_quiz_with_textbook_questions
+    
+    try:
+        result = generate_quiz_with_textbook_questions(**chapter, use_cache=use_cache)
+    except Exception as e:
+        result = {"status": "error", "success": False, "error": str(e)}
+    result.setdefault('chapter_id', chapter['chapter_id'])
+    return result
@@ -5,6 +5,7 @@ AI-powered speaking practice room with real-time conversation and detailed analy
 import os
 import logging
 import json
+from django.db.models import Avg, Count, Sum
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -32,7 +33,7 @@ def speaking_practice_room(request):
     # Get student's previous sessions for progress tracking
     previous_sessions = SpeakingSession.objects.filter(
         student=request.user
-    ).order_by('-created_at')[:5]
+    ).defer('conversation_data').order_by('-created_at')[:5]
     
     context = {
         'user': request.user,
@@ -398,15 +399,22 @@ def speaking_practice_history(request):
     """
     View student's speaking practice history with progress tracking
     """
+    # Lists and aggregates never show the transcript, so leave it in the row
     sessions = SpeakingSession.objects.filter(
         student=request.user
-    ).order_by('-created_at')
+    ).defer('conversation_data').order_by('-created_at')
     
     # Calculate progress statistics
-    if sessions.exists():
-        total_sessions = sessions.count()
-        avg_score = sum(s.overall_score for s in sessions) / total_sessions
-        total_practice_time = sum(s.duration for s in sessions)
+    # One aggregate query instead of loading every session's JSON blobs
+    totals = sessions.aggregate(
+        total_sessions=Count('id'),
+        avg_score=Avg('overall_score'),
+        total_practice_time=Sum('duration'),
+    )
+    if totals['total_sessions']:
+        total_sessions = totals['total_sessions']
+        avg_score = totals['avg_score']
+        total_practice_time = totals['total_practice_time']
         
         # Get recent improvement trend
         recent_sessions = list(sessions[:5])
@@ -0,0 +1,163 @@
+"""
+Celery tasks for student-side maintenance
+Scheduled via CELERY_BEAT_SCHEDULE in settings
+"""
+from celery import shared_task
+from datetime import timedelta
+from django.core.cache import cache
+from django.db import models, transaction
+from django.utils import timezone
+import logging
+
+from .models import (
+    CHAT_HIT_KEY_TTL, CHAT_HIT_LOG_INTERVAL, ChatCache, ChatHistory, QuizAnswer, QuizAttempt,
+    chat_hit_interval, front_cache_enabled, log_chat_cache_hit,
+)
+
+logger = logging.getLogger('students')
+
+PURGE_BATCH_SIZE = 1000
+STALE_ATTEMPT_DAYS = 7
+# Last hit-log interval drain_chat_cache_hits has processed
+CHAT_HIT_DRAINED_KEY = 'chatq:hitlog:drained'
+CHAT_HISTORY_RETENTION_DAYS = 30
+
+
+@shared_task
+def purge_expired_chatcache(batch_size=PURGE_BATCH_SIZE):
+    """Bulk-delete stale ChatCache rows in batches of primary keys"""
+    stale = ChatCache.stale_entries()
+    total = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        # Nothing references ChatCache and it has no delete signals, so a
+        # plain DELETE ... WHERE id IN (...) is enough
+        batch = ChatCache.objects.filter(pk__in=ids)
+        total += batch._raw_delete(batch.db)
+    if total:
+        logger.info(f"[OK] Purged {total} stale chat cache entries")
+    return total
+
+
+@shared_task
+def drain_chat_cache_hits(batch_size=PURGE_BATCH_SIZE):
+    """
+    Move ChatCache hit counters from the shared cache onto the rows,
+    one UPDATE ... CASE per batch of primary keys
+    Only pks in the hit logs of the intervals finished since the last run are
+    visited, so the cost follows traffic rather than table size
+    """
+    if not front_cache_enabled():
+        return 0
+    
+    current = chat_hit_interval()
+    oldest = current - CHAT_HIT_KEY_TTL // CHAT_HIT_LOG_INTERVAL  # Older logs have expired
+    last_drained = cache.get(CHAT_HIT_DRAINED_KEY)
+    first = oldest if last_drained is None else max(last_drained + 1, oldest)
+    intervals = range(first, current)
+    
+    size_keys = {ChatCache.hit_log_size_key(interval): interval for interval in intervals}
+    log_keys = list(size_keys)
+    slot_keys = []
+    for size_key, size in cache.get_many(log_keys).items():
+        slot_keys += [ChatCache.hit_log_slot_key(size_keys[size_key], slot) for slot in range(1, size + 1)]
+    log_keys += slot_keys
+    hit_pks = sorted(set(cache.get_many(slot_keys).values()))
+    
+    total = 0
+    for start in range(0, len(hit_pks), batch_size):
+        keys = {ChatCache.hit_count_key(pk): pk for pk in hit_pks[start:start + batch_size]}
+        pending = {keys[key]: n for key, n in cache.get_many(list(keys)).items() if n}
+        if not pending:
+            continue
+        # Take the counts out before writing them, so hits arriving meanwhile
+        # stay in the counter for the next run; put them back if the write fails
+        for pk, n in list(pending.items()):
+            try:
+                left = cache.decr(ChatCache.hit_count_key(pk), n)
+            except ValueError:
+                # Counter expired since it was read - nothing left to take
+                del pending[pk]
+                continue
+            if left > 0:
+                # Hits that landed in between didn't log the pk (their count
+                # wasn't 1), so log it again for the next run
+                log_chat_cache_hit(pk)
+        if not pending:
+            continue
+        try:
+            ChatCache.objects.filter(pk__in=pending).update(
+                hit_count=models.F('hit_count') + models.Case(
+                    *[models.When(pk=pk, then=models.Value(n)) for pk, n in pending.items()],
+                    default=models.Value(0),
+                )
+            )
+        except Exception:
+            for pk, n in pending.items():
+                cache.incr(ChatCache.hit_count_key(pk), n)
+            raise
+        total += sum(pending.values())
+    
+    cache.delete_many(log_keys)
+    cache.set(CHAT_HIT_DRAINED_KEY, current - 1, CHAT_HIT_KEY_TTL)
+    if total:
+        logger.info(f"[OK] Drained {total} chat cache hits")
+    return total
+
+
+def stale_quiz_attempts(days=STALE_ATTEMPT_DAYS):
+    """Quiz attempts abandoned in progress for more than `days` days"""
+    cutoff = timezone.now() - timedelta(days=days)
+    return QuizAttempt.objects.filter(status='in_progress', started_at__lt=cutoff)
+
+
+@shared_task
+def purge_stale_quiz_attempts(days=STALE_ATTEMPT_DAYS, batch_size=PURGE_BATCH_SIZE):
+    """Delete abandoned quiz attempts and their answers, one batch at a time"""
+    stale = stale_quiz_attempts(days)
+    total = 0
+    while True:
+        ids = list(stale.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            break
+        # QuizAnswer is the only thing pointing at QuizAttempt and neither
+        # has delete signals, so the cascade is done by hand with two DELETEs
+        # instead of Collector loading every row
+        with transaction.atomic():
+            answers = QuizAnswer.objects.filter(attempt_id__in=ids)
+            answers._raw_delete(answers.db)
+            attempts = QuizAttempt.objects.filter(pk__in=ids)
+            total += attempts._raw_delete(attempts.db)
+    if total:
+        logger.info(f"[OK] Purged {total} stale quiz attempts")
+    return total
+
+
+@shared_task
+def purge_old_chat_history(days=CHAT_HISTORY_RETENTION_DAYS, batch_size=PURGE_BATCH_SIZE):
+    """Delete chat turns older than `days` days as primary-key ranges"""
+    cutoff = timezone.now() - timedelta(days=days)
+    # Rows are insert-only with auto_now_add, so ids grow with created_at:
+    # everything up to the newest expired id is old. Finding that id walks
+    # back from the newest row, and each batch below is a cheap PK range
+    # instead of a created_at scan over the whole table
+    boundary = (
+        ChatHistory.objects.filter(created_at__lt=cutoff)
+        .order_by('-pk').values_list('pk', flat=True).first()
+    )
+    total = 0
+    while boundary is not None:
+        ids = list(
+            ChatHistory.objects.filter(pk__lte=boundary)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        # Nothing references ChatHistory and it has no delete signals
+        batch = ChatHistory.objects.filter(pk__gte=ids[0], pk__lte=ids[-1])
+        total += batch._raw_delete(batch.db)
+    if total:
+        logger.info(f"[OK] Purged {total} chat history records older than {days} days")
+    return total
@@ -141,7 +141,7 @@ class TestAnalyzer:
             by_chapter[chapter_key]['subject'] = attempt.chapter.subject
             
             # Topic stats from answers
-            answers = attempt.answers.select_related('question').all()
+            answers = attempt.answers.select_related('question').defer('question__rag_context')
             for answer in answers:
                 topic = answer.question.topic
                 by_topic[topic]['total'] += 1
@@ -188,7 +188,7 @@ class TestAnalyzer:
         attempts = UnitTestAttempt.objects.filter(
             student=self.student,
             status='evaluated'
-        ).select_related('unit_test').prefetch_related('answers__question')
+        ).select_related('unit_test').prefetch_related('unit_test__chapters', 'answers__question')
         
         total_attempts = attempts.count()
         if total_attempts == 0:
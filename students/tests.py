@@ -1,3 +1,106 @@
-from django.test import TestCase
+from django.test import SimpleTestCase
 
-# Create your tests here.
+from students.improved_quiz_generator import (
+    _iter_ndjson_items,
+    extract_questions_from_documents,
+    try_parse_native_mcq,
+)
+
+
+class NativeMCQParsingTests(SimpleTestCase):
+    """try_parse_native_mcq: textbook MCQs that carry their own answer key"""
+
+    def test_answer_after_options(self):
+        text = (
+            "Which of these is a fruit?\n"
+            "(a) Car\n"
+            "(b) Apple\n"
+            "(c) Rock\n"
+            "(d) Pen\n"
+            "Answer: (b)"
+        )
+        mcq = try_parse_native_mcq(text)
+        self.assertIsNotNone(mcq)
+        self.assertEqual(mcq['original_question'], "Which of these is a fruit?")
+        variant = mcq['variants'][0]
+        self.assertEqual(variant['correct'], 'B')
+        self.assertEqual(variant['options'], {'A': 'Car', 'B': 'Apple', 'C': 'Rock', 'D': 'Pen'})
+
+    def test_answer_before_options_is_ignored(self):
+        text = (
+            "Which of these is a fruit?\n"
+            "Answer: B\n"
+            "(a) Car\n"
+            "(b) Apple\n"
+            "(c) Rock\n"
+            "(d) Pen"
+        )
+        self.assertIsNone(try_parse_native_mcq(text))
+
+    def test_answer_prose_is_not_an_answer_key(self):
+        text = (
+            "Answer a few questions about the water cycle.\n"
+            "(a) Evaporation\n"
+            "(b) Condensation\n"
+            "(c) Precipitation\n"
+            "(d) Collection\n"
+            "Answer all of them in your notebook."
+        )
+        self.assertIsNone(try_parse_native_mcq(text))
+
+    def test_missing_option_is_rejected(self):
+        text = (
+            "Which of these is a fruit?\n"
+            "(a) Car\n"
+            "(b) Apple\n"
+            "(c) Rock\n"
+            "Answer: (b)"
+        )
+        self.assertIsNone(try_parse_native_mcq(text))
+
+
+class NDJSONStreamTests(SimpleTestCase):
+    """_iter_ndjson_items: MCQ lines reassembled from streamed chunks"""
+
+    def test_line_split_across_chunks(self):
+        pieces = ['{"a": 1}\n{"b"', ': 2}', '\n{"c": 3}']
+        self.assertEqual(list(_iter_ndjson_items(pieces)), [{'a': 1}, {'b': 2}, {'c': 3}])
+
+    def test_chatter_and_malformed_lines_are_skipped(self):
+        pieces = ['```json\n{"a": 1}\n{"b": \n', 'Here you go\n{"c": 3},\n```']
+        self.assertEqual(list(_iter_ndjson_items(pieces)), [{'a': 1}, {'c': 3}])
+
+
+class TextbookQuestionExtractionTests(SimpleTestCase):
+    """extract_questions_from_documents: section questions across chunks"""
+
+    def test_duplicates_ignore_case_and_punctuation(self):
+        documents = [
+            "Let us reflect\n"
+            "1. Why do rivers flow from mountains to the sea?\n"
+            "2. What happens to rain water in a city?",
+            "Let us reflect:\n"
+            "1. why do rivers flow from mountains, to the sea\n"
+            "2. Name three sources of fresh water near you.",
+        ]
+        questions = extract_questions_from_documents(documents)
+        self.assertEqual([q['text'] for q in questions], [
+            "Why do rivers flow from mountains to the sea?",
+            "What happens to rain water in a city?",
+            "Name three sources of fresh water near you.",
+        ])
+
+    def test_section_ends_at_blank_line(self):
+        documents = [
+            "Let us reflect\n"
+            "1. Why do rivers flow from mountains to the sea?\n"
+            "\n"
+            "2. This numbered line is outside the section entirely."
+        ]
+        questions = extract_questions_from_documents(documents)
+        self.assertEqual(len(questions), 1)
+
+    def test_limit(self):
+        body = "\n".join(f"{i}. Question number {i} about the chapter content?" for i in range(1, 8))
+        questions = extract_questions_from_documents(["Let us reflect\n" + body], limit=3)
+        self.assertEqual(len(questions), 3)
@@ -68,6 +68,7 @@ class UnitTestEvaluator:
         # Get all answers
         answers = UnitTestAnswer.objects.filter(attempt=attempt).select_related('question')
         
+        evaluated_answers = []
         total_marks = 0.0
         total_content = 0.0
         total_grammar = 0.0
@@ -101,7 +102,7 @@ class UnitTestEvaluator:
             answer_obj.evaluation_type = result['evaluation_type']
             answer_obj.evaluation_model = result.get('ai_model_used', model_to_use)
             answer_obj.evaluated_at = timezone.now()
-            answer_obj.save()
+            evaluated_answers.append(answer_obj)
             
             # Accumulate stats
             total_marks += result['awarded_marks']
@@ -123,6 +124,13 @@ class UnitTestEvaluator:
                        f"grammar: {result['grammar_score']*100:.0f}%) "
                        f"[{result['evaluation_type']}]")
         
+        # Write every answer's evaluation in one statement; the attempt total
+        # below comes from this same pass, so no SUM query is needed later
+        UnitTestAnswer.objects.bulk_update(evaluated_answers, [
+            'awarded_marks', 'content_score', 'grammar_score', 'ai_feedback',
+            'evaluation_type', 'evaluation_model', 'evaluated_at',
+        ])
+        
         # Calculate averages
         avg_content = total_content / max(1, evaluated_count)
         avg_grammar = total_grammar / max(1, evaluated_count)
@@ -1,7 +1,6 @@
 import os
 import logging
 import json
-from datetime import timedelta
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
@@ -63,11 +62,10 @@ def initialize_rag_system():
     # NOTE: No longer creating ChromaDB client here - using vector_db_utils
     # The vector_db_utils automatically handles Pinecone/ChromaDB based on VECTOR_DB env
     try:
-        from ncert_project.vector_db_utils import get_vector_db_manager
+        from ncert_project.vector_db_utils import VECTOR_DB_NAME, get_vector_db_manager
         vector_manager = get_vector_db_manager()
         RAG_SYSTEM["vector_manager"] = vector_manager
-        db_type = "Pinecone" if hasattr(vector_manager, 'index_name') else "ChromaDB"
-        logger.info(f"[OK] Vector DB initialized: {db_type}")
+        logger.info(f"[OK] Vector DB initialized: {VECTOR_DB_NAME}")
     except Exception as e:
         logger.error(f"Error initializing Vector DB manager: {e}")
         return # Stop if database fails
@@ -211,11 +209,11 @@ def ask_chatbot(request):
     if any(phrase in question_lower for phrase in ['forget this', 'remove from memory', 'delete this']):
         try:
             # Get last chat to remove from permanent memory
-            last_chat = ChatHistory.objects.filter(student=request.user).order_by('-created_at').first()
-            if last_chat:
+            last_question = ChatHistory.objects.filter(student=request.user).order_by('-created_at').values_list('question', flat=True).first()
+            if last_question:
                 deleted = PermanentMemory.objects.filter(
                     student=request.user,
-                    question=last_chat.question
+                    question=last_question
                 ).delete()[0]
                 
                 if deleted > 0:
@@ -262,17 +260,18 @@ def ask_chatbot(request):
     
     # TIER 1: Check Permanent Memory (user-specific)
     try:
+        # Walks this student's memories newest-first on (student, -last_accessed)
+        # and stops at the first match; only the served columns are fetched
         perm_memory = PermanentMemory.objects.filter(
             student=request.user,
             keywords__icontains=question[:50]
-        ).first()
+        ).only('answer', 'images', 'sources').first()
         
         if perm_memory:
             answer = perm_memory.answer
             images = perm_memory.images or []
             sources = perm_memory.sources or []
-            perm_memory.access_count += 1
-            perm_memory.save()
+            perm_memory.touch()
             used_cache = True
             logger.info("[OK] Answer from permanent memory")
     except Exception as e:
@@ -300,14 +299,13 @@ def ask_chatbot(request):
         # 3a. Vector DB RAG Retrieval (PRIMARY SOURCE - ALWAYS SEARCH FIRST!)
         # Uses Pinecone in production, ChromaDB for local
         try:
-            from ncert_project.vector_db_utils import get_vector_db_manager
+            from ncert_project.vector_db_utils import VECTOR_DB_NAME, get_vector_db_manager
             vector_manager = get_vector_db_manager()
-            db_type = "Pinecone" if hasattr(vector_manager, 'index_name') else "ChromaDB"
             
             # Query vector DB ACROSS ALL CHAPTERS in student's class
             # This allows finding answers even if student doesn't know which chapter contains the info
             # Example: "What is dune?" → Searches all Class 5 chapters, finds Geography chapter
-            logger.info(f"[SEARCH] Querying {db_type} (RAG) across ALL chapters for Class {standard}: {question[:50]}...")
+            logger.info(f"[SEARCH] Querying {VECTOR_DB_NAME} (RAG) across ALL chapters for Class {standard}: {question[:50]}...")
             results = vector_manager.query_by_class_subject_chapter(
                 query_text=question,
                 class_num=str(standard) if standard else None,
@@ -396,13 +394,13 @@ def ask_chatbot(request):
                 context_found = True
                 
                 # Log cross-chapter search results
-                logger.info(f"[OK] Found {len(documents)} relevant chunks from NCERT textbooks ({db_type})")
+                logger.info(f"[OK] Found {len(documents)} relevant chunks from NCERT textbooks ({VECTOR_DB_NAME})")
                 logger.info(f"   [BOOK] Subjects found: {', '.join(subjects_found)}")
                 logger.info(f"   [BOOK] Chapters found: {', '.join(sorted(chapters_found))}")
                 if len(chapters_found) > 1:
                     logger.info(f"   [SUCCESS] Cross-chapter search successful! Found content from {len(chapters_found)} different chapters")
             else:
-                logger.info(f"[WARNING]  No relevant content found in {db_type}")
+                logger.info(f"[WARNING]  No relevant content found in {VECTOR_DB_NAME}")
                 
         except Exception as e:
             logger.error(f"[ERROR] Error during Vector DB RAG retrieval: {e}")
@@ -532,12 +530,12 @@ def ask_chatbot(request):
         # Get conversation history for multi-turn context (last 5 messages)
         conversation_history = []
         try:
-            recent_chats = ChatHistory.objects.filter(student=request.user).order_by('-created_at')[:5]
+            recent_chats = ChatHistory.objects.filter(student=request.user).order_by('-created_at').values('question', 'answer')[:5]
             # Reverse to get chronological order (oldest first)
             for chat in reversed(list(recent_chats)):
                 conversation_history.append({
-                    "question": chat.question,
-                    "answer": chat.answer
+                    "question": chat['question'],
+                    "answer": chat['answer']
                 })
             if conversation_history:
                 logger.info(f"📜 Including {len(conversation_history)} previous messages for context")
@@ -710,8 +708,13 @@ Return ONLY the image prompt, no other text."""
                     quality_score = 0.5
                     avg_relevance = 0.0
                 
+                question_hash = get_query_hash(question)
+                # A stale row for this question may still be waiting for the
+                # purge task; clear it so the unique hash can be reused
+                stale = ChatCache.stale_entries().filter(question_hash=question_hash)
+                stale._raw_delete(stale.db)
                 ChatCache.objects.create(
-                    question_hash=get_query_hash(question),
+                    question_hash=question_hash,
                     question=question,
                     answer=answer,
                     images=images if images else None,
@@ -723,7 +726,7 @@ Return ONLY the image prompt, no other text."""
                 )
                 
                 # Log cache duration based on quality
-                cache_days = 10 if quality_score >= 0.7 else (3 if quality_score >= 0.5 else 1)
+                cache_days = ChatCache.ttl_for(bool(rag_context), quality_score).days
                 logger.info(f"[OK] Answer cached for {cache_days} days (quality: {quality_score:.2f}, RAG: {avg_relevance:.2f})")
             except Exception as e:
                 logger.error(f"Failed to cache answer: {e}")
@@ -825,7 +828,8 @@ def student_dashboard(request):
     """
     Student dashboard showing recent chats and stats
     """
-    recent_chats = ChatHistory.objects.filter(student=request.user).order_by('-created_at')[:10]
+    # The dashboard shows a 25-word preview, so long answers aren't fetched whole
+    recent_chats = ChatHistory.objects.listing().filter(student=request.user).order_by('-created_at')[:10]
     total_chats = ChatHistory.objects.filter(student=request.user).count()
     
     context = {
@@ -915,8 +919,8 @@ def clean_old_chats():
     """
     Utility function to clean up old chat history (can be called via management command)
     """
-    cutoff = timezone.now() - timedelta(days=30)
-    deleted_count = ChatHistory.objects.filter(created_at__lt=cutoff).delete()[0]
+    from .tasks import purge_old_chat_history
+    deleted_count = purge_old_chat_history(days=30)
     logger.info(f"Cleaned {deleted_count} old chat records")
     return deleted_count
 
@@ -1332,7 +1336,12 @@ def previous_papers_upload(request):
             return JsonResponse({'error': str(e)}, status=500)
     
     # GET request - show upload form
-    papers = PreviousYearPaper.objects.filter(student=request.user).order_by('-uploaded_at')
+    # The upload page lists paper metadata only; extracted text stays unread
+    papers = (
+        PreviousYearPaper.objects.filter(student=request.user)
+        .defer('extracted_text', 'questions_list')
+        .order_by('-uploaded_at')
+    )
     
     context = {
         'papers': papers,
@@ -1365,10 +1374,11 @@ def analyze_papers(request):
         logger.info(f"[SEARCH] Analyzing {len(paper_ids)} papers for {request.user.email}")
         
         # Get papers
+        # Old extraction results are overwritten below, so don't load them
         papers = PreviousYearPaper.objects.filter(
             id__in=paper_ids,
             student=request.user
-        )
+        ).defer('extracted_text', 'questions_list')
         
         if not papers.exists():
             return JsonResponse({'error': 'No valid papers found'}, status=404)
@@ -1377,13 +1387,16 @@ def analyze_papers(request):
         analyzer = PaperAnalyzer()
         
         # Process each paper
-        all_questions = []
+        # Only the count of extracted questions is needed here; the lists
+        # themselves are saved per paper, not accumulated in memory
+        total_questions = 0
         combined_chapter_scores = {}
         
-        for paper in papers:
+        # Stream papers instead of caching the whole queryset on `papers`
+        for paper in papers.iterator(chunk_size=50):
             # Update status
             paper.status = 'processing'
-            paper.save()
+            paper.save(update_fields=['status'])
             
             # Get paper path
             paper_path = paper.pdf_file.path
@@ -1405,7 +1418,7 @@ def analyze_papers(request):
                 paper.processed_at = timezone.now()
                 paper.save()
                 
-                all_questions.extend(result.get('questions_list', []))
+                total_questions += len(paper.questions_list or [])
                 
                 # Merge chapter scores
                 for chapter, data in result.get('chapter_importance', {}).items():
@@ -1422,11 +1435,11 @@ def analyze_papers(request):
                     combined_chapter_scores[chapter]['topics'].update(data.get('topics', []))
             else:
                 paper.status = 'failed'
-                paper.save()
+                paper.save(update_fields=['status'])
                 logger.error(f"Failed to process paper {paper.id}: {result.get('error')}")
         
         # Recalculate combined scores
-        analyzer._calculate_importance_scores(combined_chapter_scores, len(all_questions))
+        analyzer._calculate_importance_scores(combined_chapter_scores, total_questions)
         
         # Sort chapters
         sorted_chapters = sorted(
@@ -1442,17 +1455,18 @@ def analyze_papers(request):
         # Generate study strategy
         analysis_data = {
             'chapter_importance': dict(sorted_chapters),
-            'total_questions': len(all_questions),
+            'total_questions': total_questions,
             'priority_chapters': analyzer._get_priority_list(sorted_chapters, 10),
         }
         
         strategy = analyzer.generate_study_strategy(analysis_data, available_days)
         
         # Create or update analysis record
+        first_paper = papers.first()
         analysis, created = PaperAnalysis.objects.update_or_create(
             student=request.user,
-            standard=papers.first().standard,
-            subject=papers.first().subject,
+            standard=first_paper.standard,
+            subject=first_paper.subject,
             defaults={
                 'chapter_importance': dict(sorted_chapters),
                 'topic_importance': {},
@@ -300,7 +300,7 @@ def is_educational_query(query: str) -> bool:
     return any(keyword in query_lower for keyword in educational_keywords)
 
 
-def get_query_hash(query: str) -> str:
-    """Generate MD5 hash of normalized query for caching"""
+def get_query_hash(query: str) -> bytes:
+    """Generate raw MD5 digest of normalized query for caching"""
     normalized = normalize_query(query)
-    return hashlib.md5(normalized.encode()).hexdigest()
+    return hashlib.md5(normalized.encode()).digest()
@@ -25,7 +25,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('=' * 60))
             
             book_chapters = db.book_chapters
-            book_total = book_chapters.count_documents({})
+            book_total = book_chapters.estimated_document_count()
             
             self.stdout.write(f'\nTotal chapters in book_chapters: {book_total}')
             
@@ -51,7 +51,8 @@ class Command(BaseCommand):
                 
                 # Sample chapters
                 self.stdout.write('\n📝 Sample Chapters:')
-                for ch in book_chapters.find().limit(5):
+                sample_fields = {'_id': 0, 'class_number': 1, 'subject': 1, 'chapter_name': 1}
+                for ch in book_chapters.find({}, sample_fields).limit(5):
                     self.stdout.write(f"  • {ch.get('class_number')} - {ch.get('subject')} - {ch.get('chapter_name')}")
             else:
                 self.stdout.write(self.style.WARNING('\n❌ No chapters found in book_chapters!'))
@@ -64,7 +65,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS('=' * 60))
             
             quiz_chapters = db.quiz_chapters
-            quiz_total = quiz_chapters.count_documents({})
+            quiz_total = quiz_chapters.estimated_document_count()
             
             self.stdout.write(f'\nTotal chapters in quiz_chapters: {quiz_total}')
             
@@ -102,7 +102,7 @@ class Command(BaseCommand):
         # Step 6: Get collection stats
         self.stdout.write('\n📊 Step 6: Collection statistics...')
         try:
-            count = col.count_documents({})
+            count = col.estimated_document_count()
             self.stdout.write(self.style.SUCCESS(f'✅ Total saved questions in database: {count}'))
         except Exception as e:
             self.stdout.write(self.style.WARNING(f'⚠️  Could not get count: {e}'))
@@ -16,10 +16,11 @@ import openai
 import pytesseract
 from PIL import Image
 import io
+from concurrent.futures import ThreadPoolExecutor
 from pdf2image import convert_from_path
 
 # Import unified vector database manager (Pinecone/ChromaDB)
-from ncert_project.vector_db_utils import get_vector_db_manager
+from ncert_project.vector_db_utils import VECTOR_DB_NAME, get_vector_db_manager
 
 logger = logging.getLogger('superadmin')
 
@@ -139,52 +140,67 @@ def extract_text_from_pdf(pdf_path, subject=""):
     use_enhanced_extraction = is_math_heavy_subject(subject)
     
     try:
-        with pdfplumber.open(pdf_path) as pdf:
+        # Read the whole file with one sequential read and parse it from RAM,
+        # instead of letting the parser seek around the file on disk per page
+        with open(pdf_path, 'rb') as f:
+            pdf_bytes = io.BytesIO(f.read())
+        
+        with pdfplumber.open(pdf_bytes) as pdf:
             total_pages = len(pdf.pages)
             logger.info(f"Processing {total_pages} pages from PDF (Enhanced OCR: {use_enhanced_extraction})")
             
-            for i, page in enumerate(pdf.pages, start=1):
-                # Layer 1: Extract regular text from PDF
-                text = page.extract_text() or ""
-                regular_text_length = len(text)
-                
-                # Layer 2: ENHANCED - Full page OCR (extracts text from entire page image)
-                # This captures labels in diagrams, infographics, annotated images
-                full_page_ocr = extract_text_from_page_image_ocr(pdf_path, i)
-                if full_page_ocr:
-                    # Only add if OCR found significant new content
-                    # (avoid duplicating text already extracted by pdfplumber)
-                    if len(full_page_ocr) > regular_text_length * 0.3:  # OCR adds 30%+ new content
-                        text += "\n\n[FULL PAGE OCR TEXT]\n" + full_page_ocr + "\n[/FULL PAGE OCR TEXT]\n"
-                        logger.info(f"   [OK] Page {i}: Added {len(full_page_ocr)} chars from full-page OCR")
-                
-                # Layer 3: Extract text from embedded images (legacy method, still useful)
-                image_text = extract_text_from_images_ocr(page)
-                if image_text:
-                    text += "\n\n" + image_text
-                
-                # Clean up the text
-                text = text.strip()
+            # Full-page OCR shells out to poppler + tesseract for every page,
+            # so run those concurrently (the subprocesses don't hold the GIL)
+            # while pdfplumber walks the pages in order on this thread
+            ocr_workers = max(1, min(total_pages, os.cpu_count() or 1))
+            with ThreadPoolExecutor(max_workers=ocr_workers) as ocr_pool:
+                ocr_futures = {
+                    page_num: ocr_pool.submit(extract_text_from_page_image_ocr, pdf_path, page_num)
+                    for page_num in range(1, total_pages + 1)
+                }
                 
-                # Detect if page has mathematical symbols
-                math_symbols = ['=', '+', '-', '×', '÷', '∫', '∑', '√', '∞', '≤', '≥', 'π']
-                has_equations = any(symbol in text for symbol in math_symbols)
-                
-                if text:
-                    # Additional cleaning for better chunking
-                    # Remove excessive whitespace
-                    text = ' '.join(text.split())
+                for i, page in enumerate(pdf.pages, start=1):
+                    # Layer 1: Extract regular text from PDF
+                    text = page.extract_text() or ""
+                    regular_text_length = len(text)
+                    
+                    # Layer 2: ENHANCED - Full page OCR (extracts text from entire page image)
+                    # This captures labels in diagrams, infographics, annotated images
+                    full_page_ocr = ocr_futures[i].result()
+                    if full_page_ocr:
+                        # Only add if OCR found significant new content
+                        # (avoid duplicating text already extracted by pdfplumber)
+                        if len(full_page_ocr) > regular_text_length * 0.3:  # OCR adds 30%+ new content
+                            text += "\n\n[FULL PAGE OCR TEXT]\n" + full_page_ocr + "\n[/FULL PAGE OCR TEXT]\n"
+                            logger.info(f"   [OK] Page {i}: Added {len(full_page_ocr)} chars from full-page OCR")
+                    
+                    # Layer 3: Extract text from embedded images (legacy method, still useful)
+                    image_text = extract_text_from_images_ocr(page)
+                    if image_text:
+                        text += "\n\n" + image_text
                     
-                    # Preserve line breaks for better structure
-                    text = text.replace('. ', '.\n')
+                    # Clean up the text
+                    text = text.strip()
                     
-                    pages_data.append((i, text, has_equations))
+                    # Detect if page has mathematical symbols
+                    math_symbols = ['=', '+', '-', '×', '÷', '∫', '∑', '√', '∞', '≤', '≥', 'π']
+                    has_equations = any(symbol in text for symbol in math_symbols)
                     
-                    symbol_count = sum(text.count(s) for s in math_symbols)
-                    logger.info(f"Extracted page {i}/{total_pages}: {len(text)} chars, "
-                               f"math symbols: {symbol_count}")
-                else:
-                    logger.warning(f"Page {i}/{total_pages} has no extractable text")
+                    if text:
+                        # Additional cleaning for better chunking
+                        # Remove excessive whitespace
+                        text = ' '.join(text.split())
+                    
+                        # Preserve line breaks for better structure
+                        text = text.replace('. ', '.\n')
+                    
+                        pages_data.append((i, text, has_equations))
+                    
+                        symbol_count = sum(text.count(s) for s in math_symbols)
+                        logger.info(f"Extracted page {i}/{total_pages}: {len(text)} chars, "
+                                   f"math symbols: {symbol_count}")
+                    else:
+                        logger.warning(f"Page {i}/{total_pages} has no extractable text")
                     
     except Exception as e:
         logger.error(f"Error extracting PDF: {str(e)}")
@@ -280,8 +296,7 @@ def process_uploaded_book_sync(uploaded_book_id):
             raise ValueError("No chunks created from PDF")
         
         # Store in vector database (Pinecone/ChromaDB based on VECTOR_DB env)
-        db_type = "Pinecone" if hasattr(vector_db_manager, 'index_name') else "ChromaDB"
-        logger.info(f"[NOTE] Storing {len(chunks)} chunks in {db_type} with labels:")
+        logger.info(f"[NOTE] Storing {len(chunks)} chunks in {VECTOR_DB_NAME} with labels:")
         logger.info(f"   Class: {book_obj.standard}")
         logger.info(f"   Subject: {book_obj.subject}")
         logger.info(f"   Chapter: {book_obj.chapter}")
@@ -375,7 +390,10 @@ def process_uploaded_book_sync(uploaded_book_id):
                 logger.warning(f"[WARNING]  Pinecone indexing may not be complete after {elapsed_time}s - proceeding anyway")
         
         try:
-            from students.improved_quiz_generator import generate_quiz_with_textbook_questions
+            from students.improved_quiz_generator import generate_quiz_with_textbook_questions, invalidate_chapter_documents
+            
+            # The chapter's chunks just changed - don't reuse a cached copy
+            invalidate_chapter_documents(book_obj.standard, book_obj.subject, book_obj.chapter)
             
             # Create chapter_id in format: class_X_subject_chapter_Y
             chapter_num = book_obj.chapter.replace('Chapter', '').replace('chapter', '').strip()
@@ -487,8 +505,7 @@ def process_uploaded_book(self, uploaded_book_id):
             raise ValueError("No chunks created from PDF")
         
         # Store in vector database (Pinecone/ChromaDB based on VECTOR_DB env)
-        db_type = "Pinecone" if hasattr(vector_db_manager, 'index_name') else "ChromaDB"
-        logger.info(f"[NOTE] Storing {len(chunks)} chunks in {db_type} with labels:")
+        logger.info(f"[NOTE] Storing {len(chunks)} chunks in {VECTOR_DB_NAME} with labels:")
         logger.info(f"   Class: {book_obj.standard}")
         logger.info(f"   Subject: {book_obj.subject}")
         logger.info(f"   Chapter: {book_obj.chapter}")
@@ -496,7 +513,7 @@ def process_uploaded_book(self, uploaded_book_id):
         # Update progress
         self.update_state(
             state='PROGRESS',
-            meta={'current': 0, 'total': len(chunks), 'percent': 0, 'status': f'Storing in {db_type}'}
+            meta={'current': 0, 'total': len(chunks), 'percent': 0, 'status': f'Storing in {VECTOR_DB_NAME}'}
         )
         
         total_added = vector_db_manager.add_document_chunks(
@@ -610,7 +627,10 @@ def process_uploaded_book(self, uploaded_book_id):
         # ==================== AUTO-GENERATE MCQs ====================
         logger.info(f"[TARGET] Auto-generating MCQs for uploaded chapter...")
         try:
-            from students.improved_quiz_generator import generate_quiz_with_textbook_questions
+            from students.improved_quiz_generator import generate_quiz_with_textbook_questions, invalidate_chapter_documents
+            
+            # The chapter's chunks just changed - don't reuse a cached copy
+            invalidate_chapter_documents(book_obj.standard, book_obj.subject, book_obj.chapter)
             
             # Create chapter_id in format: class_X_subject_chapter_Y
             chapter_num = book_obj.chapter.replace('Chapter', '').replace('chapter', '').strip()
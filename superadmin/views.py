@@ -169,6 +169,7 @@ def delete_upload(request, upload_id):
     from django.conf import settings
     from students.models import QuizChapter, QuizQuestion, QuestionVariant, QuizAttempt, QuizAnswer
     from ncert_project.chromadb_utils import get_chromadb_manager
+    from students.improved_quiz_generator import invalidate_chapter_documents
     
     upload = get_object_or_404(UploadedBook, id=upload_id)
     
@@ -195,6 +196,9 @@ def delete_upload(request, upload_id):
         except Exception as e:
             logger.warning(f"[WARNING]  Could not delete ChromaDB data: {e}")
         
+        # The chunks are gone - don't let quiz generation read a cached copy
+        invalidate_chapter_documents(upload.standard, upload.subject, upload.chapter)
+        
         # 2. Delete related quiz data
         try:
             # Find chapters matching this upload
@@ -491,10 +495,17 @@ def unit_test_create(request):
         if chapter_ids:
             from ncert_project.mongodb_utils import get_mongo_db
             db = get_mongo_db()
+            # One query for all selected chapters, names only
+            names_by_id = {
+                doc['chapter_id']: doc.get('chapter_name', doc['chapter_id'])
+                for doc in db.book_chapters.find(
+                    {'chapter_id': {'$in': list(chapter_ids)}},
+                    {'_id': 0, 'chapter_id': 1, 'chapter_name': 1}
+                )
+            }
             for chapter_id in chapter_ids:
-                chapter_doc = db.book_chapters.find_one({'chapter_id': chapter_id})
-                if chapter_doc:
-                    chapter_names.append(chapter_doc.get('chapter_name', chapter_id))
+                if chapter_id in names_by_id:
+                    chapter_names.append(names_by_id[chapter_id])
         
         # Create descriptive text with chapters
         chapters_text = ", ".join(chapter_names) if chapter_names else "Multiple Chapters"
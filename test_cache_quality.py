@@ -22,6 +22,7 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ncert_project.settings')
 django.setup()
 
 from students.models import ChatCache
+from students.tasks import purge_expired_chatcache
 from django.utils import timezone
 from datetime import timedelta
 import hashlib
@@ -29,7 +30,7 @@ import hashlib
 def get_query_hash(question):
     """Create hash for question (matches web_scraper.py logic)"""
     normalized = question.lower().strip()
-    return hashlib.md5(normalized.encode()).hexdigest()
+    return hashlib.md5(normalized.encode()).digest()
 
 def test_quality_scoring():
     """Test 1: Quality Score and Adaptive Duration"""
@@ -141,12 +142,16 @@ def test_negative_feedback():
     assert retrieved is None, "Invalidated cache should not be retrieved"
     print("   ✅ PASS: Invalidated cache not returned")
     
-    # Check if deleted
-    print("\n🗑️  Checking if cache was deleted...")
+    # Reads never delete - the row stays until the purge task runs
+    print("\n🗑️  Checking the read left the row for the purge task...")
     exists = ChatCache.objects.filter(id=cache.id).exists()
     print(f"   Cache still exists in DB: {exists}")
-    assert not exists, "Invalidated cache should be deleted"
-    print("   ✅ PASS: Invalidated cache auto-deleted")
+    assert exists, "Reading an invalidated cache should not delete it"
+    purge_expired_chatcache()
+    exists = ChatCache.objects.filter(id=cache.id).exists()
+    print(f"   Cache exists after purge: {exists}")
+    assert not exists, "Invalidated cache should be deleted by purge_expired_chatcache"
+    print("   ✅ PASS: Invalidated cache purged")
     
     print("\n✅ TEST 2 PASSED: Negative feedback system working correctly!")
 